@@ -0,0 +1,327 @@
+"""A local stand-in for api.sky.blackbaud.com and the OAuth token endpoint.
+
+Serves deterministic constituent data with SKY-style paging (count,
+value, absolute next_link), accepts writes, gift batches and document
+uploads, and can inject latency, 429s and 403s. Used by run.py, but it also works on its
+own: `python benchmarks/mock_sky.py --port 8080`.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlencode
+
+from werkzeug import Request, Response
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+API_ROOT = "https://api.sky.blackbaud.com"
+
+
+@dataclass
+class Faults:
+    latency_ms: float = 0.0
+    # uniform extra latency on top of latency_ms
+    jitter_ms: float = 0.0
+    rate_429: float = 0.0
+    rate_403: float = 0.0
+    retry_after: float = 0.05
+    token_latency_ms: float = 20.0
+
+
+@dataclass
+class Counters:
+    requests: int = 0
+    throttled: int = 0
+    forbidden: int = 0
+    token_grants: int = 0
+    writes: int = 0
+    uploads: int = 0
+    upload_bytes: int = 0
+    gifts: int = 0
+    rejected_gift_requests: int = 0
+    by_path: dict[str, int] = field(default_factory=dict)
+
+
+def constituent(i: int) -> dict:
+    cid = str(i)
+    return {
+        "id": cid,
+        "type": "Individual",
+        "lookup_id": f"L{i:07d}",
+        "first": "Ann",
+        "last": f"Smith{i}",
+        "name": f"Ann Smith{i}",
+        "gender": "Female",
+        "birthdate": {"y": 1950 + i % 50, "m": 1 + i % 12},
+        "date_added": "2020-01-02T03:04:05Z",
+        "date_modified": f"2024-01-{1 + i % 28:02d}T03:04:05Z",
+        "address": address(i),
+        "email": email(i),
+        "phone": phone(i),
+    }
+
+
+def address(i: int) -> dict:
+    return {
+        "id": f"a{i}",
+        "constituent_id": str(i),
+        "type": "Home",
+        "address_lines": f"{i} Main St",
+        "city": "Charleston",
+        "state": "SC",
+        "postal_code": f"{29400 + i % 100}",
+        "country": "United States",
+        "formatted_address": f"{i} Main St\nCharleston, SC {29400 + i % 100}",
+        "preferred": True,
+        "do_not_mail": False,
+        "inactive": False,
+        "date_added": "2020-01-02T03:04:05Z",
+        "date_modified": "2020-01-02T03:04:05Z",
+    }
+
+
+def email(i: int) -> dict:
+    return {
+        "id": f"e{i}",
+        "constituent_id": str(i),
+        "type": "Email",
+        "address": f"ann{i}@example.org",
+        "primary": True,
+        "do_not_email": False,
+        "inactive": False,
+        "date_added": "2020-01-02T03:04:05Z",
+        "date_modified": "2024-01-02T03:04:05Z",
+    }
+
+
+def phone(i: int) -> dict:
+    return {
+        "id": f"p{i}",
+        "constituent_id": str(i),
+        "type": "Home",
+        "number": f"555-{i % 10000:04d}",
+        "primary": True,
+        "do_not_call": False,
+        "inactive": False,
+        "date_added": "2020-01-02T03:04:05Z",
+        "date_modified": "2024-01-02T03:04:05Z",
+    }
+
+
+_SUBRESOURCES = {
+    "addresses": address,
+    "emailaddresses": email,
+    "phones": phone,
+}
+
+_ONE = re.compile(r"^/constituent/v1/constituents/(\d+)$")
+_SUB = re.compile(r"^/constituent/v1/constituents/(\d+)/(\w+)$")
+_GIFTS = re.compile(r"^/gift-batch/v1/giftbatches/([^/]+)/gifts$")
+_LISTS = {
+    "/constituent/v1/constituents": constituent,
+    "/constituent/v1/emailaddresses": email,
+}
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs) -> None:
+        pass
+
+
+class MockSky:
+    """Threaded werkzeug server; settings can be changed between runs."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        records: int = 20_000,
+        faults: Faults | None = None,
+        seed: int = 1,
+    ) -> None:
+        self.records = records
+        self.faults = faults or Faults()
+        self.counters = Counters()
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._server = make_server(
+            host, port, self._app, threaded=True, request_handler=_QuietHandler
+        )
+        self._server.daemon_threads = True
+        self.base_url = f"http://{host}:{self._server.server_port}"
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "MockSky":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+
+    def reset(self, faults: Faults | None = None, records: int | None = None) -> None:
+        with self._lock:
+            self.counters = Counters()
+            if faults is not None:
+                self.faults = faults
+            if records is not None:
+                self.records = records
+
+    def _count(self, **increments: int) -> None:
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self.counters, name, getattr(self.counters, name) + value)
+
+    def _roll(self, rate: float) -> bool:
+        if not rate:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    @staticmethod
+    def _json(body, status: int = 200) -> Response:
+        return Response(json.dumps(body), status=status, mimetype="application/json")
+
+    @Request.application
+    def _app(self, request: Request) -> Response:
+        path = request.path
+        with self._lock:
+            self.counters.requests += 1
+            key = _SUB.sub(r"/constituent/v1/constituents/{id}/\2", path)
+            key = _ONE.sub("/constituent/v1/constituents/{id}", key)
+            self.counters.by_path[key] = self.counters.by_path.get(key, 0) + 1
+        faults = self.faults
+
+        if path == "/token":
+            time.sleep(faults.token_latency_ms / 1000)
+            self._count(token_grants=1)
+            return self._json(self._token())
+
+        delay = faults.latency_ms
+        if faults.jitter_ms:
+            delay += self._random.uniform(0, faults.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000)
+
+        if path.startswith("/upload/"):
+            size = len(request.get_data())
+            self._count(uploads=1, upload_bytes=size)
+            return Response(status=200)
+
+        if self._roll(faults.rate_429):
+            self._count(throttled=1)
+            return Response(
+                "Rate limit is exceeded.",
+                status=429,
+                headers={"Retry-After": str(faults.retry_after)},
+            )
+        if self._roll(faults.rate_403):
+            self._count(forbidden=1)
+            return Response("Forbidden", status=403)
+
+        if request.method == "GET":
+            return self._get(request)
+        if request.method == "POST" and path == "/constituent/v1/documents":
+            return self._document()
+        if request.method == "POST" and _GIFTS.match(path):
+            return self._gifts(request)
+        self._count(writes=1)
+        if request.method == "POST":
+            with self._lock:
+                new_id = self.counters.writes
+            return self._json({"id": str(new_id)})
+        return Response(status=200)
+
+    def _get(self, request: Request) -> Response:
+        path = request.path
+        if make := _LISTS.get(path):
+            limit = min(int(request.args.get("limit", 500)), 5000)
+            offset = int(request.args.get("offset", 0))
+            end = min(offset + limit, self.records)
+            body = {
+                "count": self.records,
+                "value": [make(i) for i in range(offset, end)],
+            }
+            if end < self.records:
+                query = urlencode({"offset": end, "limit": limit})
+                body["next_link"] = f"{API_ROOT}{path}?{query}"
+            return self._json(body)
+        if match := _ONE.match(path):
+            return self._json(constituent(int(match[1])))
+        if match := _SUB.match(path):
+            make = _SUBRESOURCES.get(match[2])
+            i = int(match[1])
+            value = [make(i), make(i + 1)] if make else []
+            return self._json({"count": len(value), "value": value})
+        return Response(status=404)
+
+    def _document(self) -> Response:
+        with self._lock:
+            n = self.counters.requests
+        return self._json(
+            {
+                "file_id": f"f{n}",
+                "file_upload_request": {
+                    "url": f"{self.base_url}/upload/{n}",
+                    "method": "PUT",
+                    "headers": [{"name": "x-ms-blob-type", "value": "BlockBlob"}],
+                },
+            }
+        )
+
+    def _gifts(self, request: Request) -> Response:
+        # all or nothing, like the real endpoint: one invalid gift fails all
+        gifts = json.loads(request.get_data())["gifts"]
+        if any(gift.get("amount", {}).get("value", 0) <= 0 for gift in gifts):
+            self._count(rejected_gift_requests=1)
+            return self._json({"message": "Gift amount must be positive."}, 400)
+        with self._lock:
+            first = self.counters.gifts
+            self.counters.gifts += len(gifts)
+        return self._json({"gift_ids": [str(first + i) for i in range(len(gifts))]})
+
+    @staticmethod
+    def _token() -> dict:
+        return {
+            "access_token": f"access-{time.time_ns()}",
+            "token_type": "bearer",
+            "expires_in": 3600,
+            "refresh_token": f"refresh-{time.time_ns()}",
+            "environment_id": "p-bench",
+            "environment_name": "Benchmark",
+            "legal_entity_id": "p-bench",
+            "legal_entity_name": "Benchmark",
+            "user_id": "bench",
+            "email": "bench@example.org",
+            "family_name": "Bench",
+            "given_name": "Mark",
+            "refresh_token_expires_in": 31536000,
+            "mode": "Full",
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-403", type=float, default=0.0)
+    args = parser.parse_args()
+    mock = MockSky(
+        port=args.port,
+        records=args.records,
+        faults=Faults(
+            latency_ms=args.latency_ms, rate_429=args.rate_429, rate_403=args.rate_403
+        ),
+    )
+    print(f"mock SKY API on {mock.base_url}")
+    mock._server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,508 @@
+"""Offline benchmarks for sky-edge against the local mock in mock_sky.py.
+
+Every scenario runs in a fresh process so peak RSS is its own. Results are
+requests/sec, p50/p99 of individual HTTP attempts (taken from the
+sky.http spans) and peak RSS. Save a run with --json and compare a later
+one with --compare to see what a change to util.py did:
+
+    python benchmarks/run.py --json before.json
+    python benchmarks/run.py --compare before.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from mock_sky import API_ROOT, Faults, MockSky  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+@dataclass
+class Options:
+    base_url: str
+    records: int
+    rate: float | None
+    scale: float
+
+
+@dataclass
+class Result:
+    scenario: str
+    seconds: float
+    requests: int
+    requests_per_second: float
+    p50_ms: float | None
+    p99_ms: float | None
+    peak_rss_mb: float | None
+    decode_seconds: float
+    errors: int
+    server: dict = field(default_factory=dict)
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def _ms(seconds: float | None) -> float | None:
+    return None if seconds is None else seconds * 1000
+
+
+def _tokens(expired: bool = False):
+    from sky_edge.auth import AppTokens
+
+    granted_at = time.time() - (7200 if expired else 0)
+    return AppTokens(
+        access_token="bench",
+        token_type="bearer",
+        expires_in=3600,
+        refresh_token="bench-refresh",
+        environment_id="p-bench",
+        environment_name="Benchmark",
+        legal_entity_id="p-bench",
+        legal_entity_name="Benchmark",
+        user_id="bench",
+        email="bench@example.org",
+        family_name="Bench",
+        given_name="Mark",
+        refresh_token_expires_in=31536000,
+        mode="Full",
+        granted_at=granted_at,
+    )
+
+
+class _MemoryStore:
+    def __init__(self, tokens) -> None:
+        self.tokens = tokens
+        self._lock = threading.Lock()
+
+    def load(self):
+        return self.tokens
+
+    def save(self, tokens) -> None:
+        self.tokens = tokens
+
+    def locked(self):
+        return self._lock
+
+
+def _use_tokens(expired: bool = False) -> None:
+    from sky_edge import auth
+
+    auth.set_token_manager(auth.TokenManager(store=_MemoryStore(_tokens(expired))))
+
+
+def _setup(options: Options) -> None:
+    from requests.adapters import HTTPAdapter
+
+    from sky_edge import auth, util
+
+    class Redirect(HTTPAdapter):
+        def send(self, request, **kwargs):
+            request.url = options.base_url + request.url[len(API_ROOT) :]
+            return super().send(request, **kwargs)
+
+    client = util.get_client()
+    client.session.mount(
+        API_ROOT,
+        Redirect(
+            pool_connections=client.config.pool_connections,
+            pool_maxsize=client.config.pool_maxsize,
+            pool_block=client.config.pool_block,
+        ),
+    )
+    auth.TOKEN_URL = f"{options.base_url}/token"
+    util.configure_throttling(
+        rate=options.rate, retry_policy=util.RetryPolicy(backoff_base=0.05)
+    )
+    _use_tokens()
+
+
+def _n(options: Options, count: int) -> int:
+    return max(1, int(count * options.scale))
+
+
+# scenarios: each returns the number of failed operations
+
+
+def paginate(options: Options, prefetch: int = 0) -> int:
+    from sky_edge.api.constituent import ConstituentListQuery, constituent_list_get
+
+    first = constituent_list_get(ConstituentListQuery(limit=500))
+    return sum(1 for _ in first.iter_all(prefetch=prefetch)) != options.records
+
+
+def paginate_prefetch(options: Options) -> int:
+    return paginate(options, prefetch=2)
+
+
+def bulk_list(options: Options) -> int:
+    from sky_edge.api.constituent import ConstituentListQuery, constituent_list_bulk_get
+
+    records = constituent_list_bulk_get(ConstituentListQuery(limit=500), workers=8)
+    return sum(1 for _ in records) != options.records
+
+
+def fanout(options: Options) -> int:
+    from sky_edge.api.constituent import ProfileInclude, fetch_profiles
+
+    profiles = fetch_profiles(
+        (str(i) for i in range(_n(options, 300))),
+        include=[
+            ProfileInclude.ADDRESSES,
+            ProfileInclude.EMAILS,
+            ProfileInclude.PHONES,
+        ],
+        workers=16,
+    )
+    return sum(1 for profile in profiles if profile.errors)
+
+
+def bulk_write(options: Options) -> int:
+    from sky_edge.api.constituent import Address, address_post
+    from sky_edge.bulk import bulk_mutate
+
+    addresses = (
+        Address(constituent_id=str(i), type="Home", address_lines=f"{i} Bench Rd")
+        for i in range(_n(options, 1000))
+    )
+    results = bulk_mutate(addresses, address_post, workers=16)
+    return sum(1 for result in results if not result.ok)
+
+
+def _gifts(options: Options, bad_every: int) -> int:
+    from sky_edge.api.gift import CurrencyValue, Gift
+    from sky_edge.api.gift_batch import submit_gifts
+
+    gifts = (
+        Gift(
+            constituent_id=str(i % options.records),
+            # every bad_every-th gift fails validation and poisons its request
+            amount=CurrencyValue(value=0 if bad_every and i % bad_every == 7 else 25),
+            type="Donation",
+        )
+        for i in range(_n(options, 20_000))
+    )
+    results = submit_gifts("bench", gifts, workers=8)
+    failed = sum(1 for result in results if not result.ok)
+    # only the planted bad gifts may fail
+    expected = len(range(7, _n(options, 20_000), bad_every)) if bad_every else 0
+    return abs(failed - expected)
+
+
+def gift_batch(options: Options) -> int:
+    return _gifts(options, bad_every=0)
+
+
+def gift_batch_isolation(options: Options) -> int:
+    return _gifts(options, bad_every=1000)
+
+
+def _decode(options: Options, mode) -> int:
+    from sky_edge.api.constituent import CollectionOfConstituents
+    from sky_edge.util import HttpMethods, api_request
+
+    failures = 0
+    for page in range(_n(options, 4)):
+        result = api_request(
+            method=HttpMethods.GET,
+            url=f"{API_ROOT}/constituent/v1/constituents",
+            params={"limit": 5000, "offset": page * 5000 % options.records},
+            response_model=CollectionOfConstituents,
+            decode_mode=mode,
+        )
+        failures += not isinstance(result, (CollectionOfConstituents, dict))
+    return failures
+
+
+def decode_validate(options: Options) -> int:
+    from sky_edge.decode import DecodeMode
+
+    return _decode(options, DecodeMode.VALIDATE)
+
+
+def decode_raw(options: Options) -> int:
+    from sky_edge.decode import DecodeMode
+
+    return _decode(options, DecodeMode.RAW)
+
+
+def decode_compact(options: Options) -> int:
+    from sky_edge.decode import DecodeMode
+
+    return _decode(options, DecodeMode.COMPACT)
+
+
+def token_refresh(options: Options) -> int:
+    from sky_edge.api.constituent import constituent_get
+
+    failures = 0
+    for _ in range(_n(options, 10)):
+        # every round starts with an expired token and 64 callers at once
+        _use_tokens(expired=True)
+        with ThreadPoolExecutor(max_workers=64) as pool:
+            results = list(pool.map(constituent_get, (str(i) for i in range(64))))
+        failures += sum(1 for r in results if not hasattr(r, "lookup_id"))
+    return failures
+
+
+def upload(options: Options) -> int:
+    from sky_edge.api.constituent import NewDocumentInfo, document_post
+    from sky_edge.util import ContentType
+
+    payload = os.urandom(1024 * 1024)
+
+    def one(i: int) -> bool:
+        definition = document_post(NewDocumentInfo(file_name=f"bench-{i}.pdf"))
+        if not hasattr(definition, "file_upload_request"):
+            return False
+        return definition.upload_binary(payload, ContentType.PDF).ok
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        return sum(1 for ok in pool.map(one, range(_n(options, 100))) if not ok)
+
+
+def _webhook(options: Options, count: int, max_pending: int) -> int:
+    from collections import Counter
+
+    from sky_edge.api.webhook import WebhookReceiver, generate_events, send_events
+
+    # a tenth of the deliveries repeat an earlier event, as SKY redeliveries do
+    events = list(generate_events(count, duplicate_rate=0.1, seed=1))
+    delivered: Counter[str] = Counter()
+    lock = threading.Lock()
+    receiver = WebhookReceiver(max_pending=max_pending, invalidate_cache=False)
+
+    @receiver.on()
+    def record(batch) -> None:
+        with lock:
+            delivered.update(event.id for event in batch)
+
+    url = receiver.start()
+    try:
+        send_events(url, events, batch_size=100, workers=8)
+    finally:
+        receiver.close()
+    stats = receiver.stats
+    # every event handled exactly once, in batches, and with a small queue
+    # only after some deliveries were turned away and redelivered
+    missing = len({event.id for event in events} - delivered.keys())
+    repeated = sum(n - 1 for n in delivered.values())
+    unbatched = stats.batches >= stats.handled
+    no_backpressure = max_pending < 100 and not stats.rejected
+    return missing + repeated + unbatched + no_backpressure
+
+
+def webhook(options: Options) -> int:
+    return _webhook(options, _n(options, 50_000), max_pending=100_000)
+
+
+def webhook_backpressure(options: Options) -> int:
+    # a queue smaller than one delivery rejects every batch at least once
+    return _webhook(options, _n(options, 2_000), max_pending=50)
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    run: Callable[[Options], int]
+    faults: dict = field(default_factory=dict)
+
+
+SCENARIOS = {
+    s.name: s
+    for s in (
+        Scenario("paginate", paginate),
+        Scenario("paginate_prefetch", paginate_prefetch),
+        Scenario("bulk_list", bulk_list),
+        Scenario("fanout", fanout),
+        Scenario("fanout_faults", fanout, faults={"rate_429": 0.05, "rate_403": 0.02}),
+        Scenario("bulk_write", bulk_write),
+        Scenario("gift_batch", gift_batch),
+        Scenario("gift_batch_isolation", gift_batch_isolation),
+        Scenario("decode_validate", decode_validate),
+        Scenario("decode_raw", decode_raw),
+        Scenario("decode_compact", decode_compact),
+        Scenario("token_refresh", token_refresh),
+        Scenario("upload", upload),
+        Scenario("webhook", webhook),
+        Scenario("webhook_backpressure", webhook_backpressure),
+    )
+}
+
+
+def _child(name: str, options: Options, results: multiprocessing.Queue) -> None:
+    # keep the benchmark away from the real token cache
+    os.environ["SKY_EDGE_TOKEN_CACHE"] = ""
+    from sky_edge import metrics
+
+    _setup(options)
+    attempts: list[float] = []
+    decoding: list[float] = []
+
+    def collect(span: metrics.Span) -> None:
+        if span.name == metrics.HTTP:
+            attempts.append(span.seconds)
+        elif span.name == metrics.DECODE:
+            decoding.append(span.seconds)
+
+    metrics.add_hook(collect)
+    started = time.perf_counter()
+    errors = SCENARIOS[name].run(options)
+    seconds = time.perf_counter() - started
+    results.put(
+        Result(
+            scenario=name,
+            seconds=seconds,
+            requests=len(attempts),
+            requests_per_second=len(attempts) / seconds,
+            p50_ms=_ms(_percentile(attempts, 50)),
+            p99_ms=_ms(_percentile(attempts, 99)),
+            peak_rss_mb=_peak_rss_mb(),
+            decode_seconds=sum(decoding),
+            errors=int(errors),
+        )
+    )
+
+
+def run(mock: MockSky, name: str, options: Options, faults: Faults) -> Result:
+    mock.reset(
+        faults=replace(faults, **SCENARIOS[name].faults), records=options.records
+    )
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_child, args=(name, options, results))
+    process.start()
+    while True:
+        try:
+            result = results.get(timeout=1)
+            break
+        except queue.Empty:
+            if not process.is_alive():
+                raise RuntimeError(f"{name} exited with code {process.exitcode}")
+    process.join()
+    counters = mock.counters
+    result.server = {
+        "requests": counters.requests,
+        "throttled": counters.throttled,
+        "forbidden": counters.forbidden,
+        "token_grants": counters.token_grants,
+        "upload_mb": round(counters.upload_bytes / 1e6, 1),
+        "gifts": counters.gifts,
+        "rejected_gift_requests": counters.rejected_gift_requests,
+    }
+    return result
+
+
+def _fmt(value: float | None, digits: int = 1) -> str:
+    return "-" if value is None else f"{value:.{digits}f}"
+
+
+def report(results: list[Result], baseline: dict[str, dict] | None = None) -> None:
+    header = (
+        f"{'scenario':<22} {'req':>6} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}"
+        f" {'rss MB':>8} {'decode s':>9} {'err':>4}  server"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r.scenario:<22} {r.requests:>6} {r.requests_per_second:>9.1f}"
+            f" {_fmt(r.p50_ms, 2):>8} {_fmt(r.p99_ms, 2):>8}"
+            f" {_fmt(r.peak_rss_mb):>8} {r.decode_seconds:>9.3f} {r.errors:>4}"
+            f"  {' '.join(f'{k}={v}' for k, v in r.server.items() if v)}"
+        )
+        if baseline and (old := baseline.get(r.scenario)):
+            changes = []
+            for key, label in (
+                ("requests_per_second", "req/s"),
+                ("p50_ms", "p50"),
+                ("p99_ms", "p99"),
+                ("peak_rss_mb", "rss"),
+                ("decode_seconds", "decode"),
+            ):
+                before, after = old.get(key), getattr(r, key)
+                if before and after is not None:
+                    changes.append(f"{label} {100 * (after - before) / before:+.1f}%")
+            print(f"{'':<22} vs baseline: {', '.join(changes)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "scenarios", nargs="*", help=f"default: all of {', '.join(SCENARIOS)}"
+    )
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="multiply per-scenario workloads"
+    )
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--jitter-ms", type=float, default=1.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-403", type=float, default=0.0)
+    parser.add_argument(
+        "--rate", type=float, default=None, help="client rate limit, default none"
+    )
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    parser.add_argument("--compare", type=Path, help="baseline from an earlier --json")
+    args = parser.parse_args()
+    if unknown := set(args.scenarios) - SCENARIOS.keys():
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    faults = Faults(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_429=args.rate_429,
+        rate_403=args.rate_403,
+    )
+    mock = MockSky(records=args.records, faults=faults).start()
+    options = Options(
+        base_url=mock.base_url, records=args.records, rate=args.rate, scale=args.scale
+    )
+    try:
+        results = [
+            run(mock, name, options, faults) for name in args.scenarios or SCENARIOS
+        ]
+    finally:
+        mock.stop()
+
+    baseline = None
+    if args.compare:
+        baseline = {r["scenario"]: r for r in json.loads(args.compare.read_text())}
+    report(results, baseline)
+    if args.json:
+        args.json.write_text(json.dumps([asdict(r) for r in results], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import asyncio
+import weakref
+from typing import AsyncIterator, Type
+
+try:
+    import httpx
+except ImportError as e:  # pragma: no cover
+    raise ImportError(
+        "sky_edge.aio requires httpx, install with `pip install sky-edge[aio]`"
+    ) from e
+
+from pydantic import BaseModel
+
+from .. import auth
+from ..auth import AppTokens
+from ..util import Collection, HttpMethods, T, build_headers, get_client
+
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+
+# an AsyncClient's connections and an asyncio.Lock belong to the loop they
+# were first used on, so each running loop gets its own
+_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = (
+    weakref.WeakKeyDictionary()
+)
+_token_locks: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(30.0),
+        )
+    return client
+
+
+async def aclose() -> None:
+    """Close the running loop's client, call before the loop shuts down."""
+    if (client := _clients.pop(asyncio.get_running_loop(), None)) is not None:
+        await client.aclose()
+
+
+def _get_token_lock() -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    if (lock := _token_locks.get(loop)) is None:
+        lock = _token_locks[loop] = asyncio.Lock()
+    return lock
+
+
+async def get_auth_token() -> AppTokens:
+    # Fast path needs no lock; on expiry only one coroutine runs the blocking
+    # refresh in a worker thread while the others wait on the lock and then
+    # pick up the fresh token.
+    manager = auth.get_token_manager()
+    if token := manager.current():
+        return token
+    async with _get_token_lock():
+        if token := manager.current():
+            return token
+        return await asyncio.to_thread(manager.get)
+
+
+async def write_json(model: BaseModel, **kwargs) -> str:
+    """util.write_json for the async helpers. The write check may refresh
+    the code tables with blocking requests, so it runs in a worker thread."""
+    if (check := get_client().check_write) is not None:
+        await asyncio.to_thread(check, model)
+    return model.model_dump_json(**kwargs)
+
+
+async def generic_request(
+    method: HttpMethods, url: str, json=None, drop_headers: bool = False, **kwargs
+) -> httpx.Response:
+    token = await get_auth_token()
+    headers = build_headers(
+        incoming_headers=kwargs.pop("headers", None),
+        drop_headers=drop_headers,
+        access_token=token.access_token,
+    )
+    # requests silently skips None header values, httpx rejects them
+    headers = {k: v for k, v in headers.items() if v is not None}
+    # requests takes a raw body as data=, httpx wants content=
+    if isinstance(kwargs.get("data"), (str, bytes)):
+        kwargs["content"] = kwargs.pop("data")
+    if json is not None:
+        kwargs["json"] = json
+    client = _get_client()
+    response = await client.request(method=method, url=url, headers=headers, **kwargs)
+    if response.status_code == 403 and not drop_headers:
+        headers["authorization"] = f"Bearer {(await get_auth_token()).access_token}"
+        return await client.request(method=method, url=url, headers=headers, **kwargs)
+    else:
+        return response
+
+
+async def api_request(
+    method: HttpMethods,
+    url: str,
+    response_model: Type[T] | None = None,
+    **kwargs,
+) -> T | httpx.Response:
+    response = await generic_request(method=method, url=url, **kwargs)
+    if str(response.status_code)[0] == "4":
+        return response
+    elif response.status_code and response_model:
+        assert issubclass(response_model, BaseModel)
+        return response_model.model_validate_json(json_data=response.content)
+
+    return response
+
+
+async def fetch_next(
+    collection: Collection[T],
+) -> Collection[T] | httpx.Response | None:
+    if not collection.next_link:
+        return None
+    else:
+        return await api_request(
+            method=HttpMethods.GET,
+            url=collection.next_link,
+            response_model=type(collection),
+        )
+
+
+async def iter_pages(
+    collection: Collection[T], prefetch: int = 2
+) -> AsyncIterator[Collection[T]]:
+    """Async counterpart of Collection.iter_pages, prefetching in a task."""
+    pages: asyncio.Queue = asyncio.Queue(maxsize=max(prefetch, 1))
+
+    async def worker() -> None:
+        page = collection
+        try:
+            while (result := await fetch_next(page)) is not None:
+                if isinstance(result, httpx.Response):
+                    raise httpx.HTTPStatusError(
+                        f"{result.status_code} fetching {page.next_link}",
+                        request=result.request,
+                        response=result,
+                    )
+                page = result
+                await pages.put(page)
+        # failed requests, undecodable pages, token refresh failures and
+        # anything else go to the consumer, which would otherwise wait forever
+        except Exception as e:  # noqa: BLE001
+            await pages.put(e)
+            return
+        await pages.put(None)
+
+    # the next page is on its way while the caller handles the first
+    task = asyncio.create_task(worker())
+    try:
+        yield collection
+        while (item := await pages.get()) is not None:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        task.cancel()
+
+
+async def iter_all(collection: Collection[T], prefetch: int = 2) -> AsyncIterator[T]:
+    async for page in iter_pages(collection, prefetch=prefetch):
+        for item in page.value:
+            yield item
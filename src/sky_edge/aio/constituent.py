@@ -0,0 +1,306 @@
+import httpx
+
+from ..api.constituent import (
+    Address,
+    Alias,
+    Attachment,
+    CollectionOfAddresses,
+    CollectionOfAliases,
+    CollectionOfConstituents,
+    CollectionOfConstituentSearchResults,
+    CollectionOfEmails,
+    CollectionOfNotes,
+    CollectionOfPhones,
+    CollectionOfRelationships,
+    CollectionOfStrings,
+    Constituent,
+    ConstituentListQuery,
+    ConstituentSearchQuery,
+    Email,
+    FileDefinition,
+    NameFormat,
+    NameFormatEdit,
+    NameFormatSummary,
+    NewDocumentInfo,
+    Note,
+    Phone,
+    PostResponse,
+    PrimaryNameFormatEdit,
+    Relationship,
+)
+from ..util import Collection, HttpMethods, projected_collection
+from . import api_request, write_json
+
+
+async def address_post(address: Address) -> Address | httpx.Response:
+    response = await api_request(
+        method=HttpMethods.POST,
+        url="https://api.sky.blackbaud.com/constituent/v1/addresses",
+        data=await write_json(address, exclude_none=True),
+    )
+    match response.status_code:
+        case 200:
+            if response.json()["id"]:
+                address.id = response.json()["id"]
+            return address
+        case _:
+            return response
+
+
+async def address_patch(address: Address) -> httpx.Response:
+    return await api_request(
+        method=HttpMethods.PATCH,
+        url=f"https://api.sky.blackbaud.com/constituent/v1/addresses/{address.id}",
+        data=await write_json(address, exclude_none=True),
+    )
+
+
+async def address_delete(address: Address) -> httpx.Response:
+    return await api_request(
+        method=HttpMethods.DELETE,
+        url=f"https://api.sky.blackbaud.com/constituent/v1/addresses/{address.id}",
+    )
+
+
+async def address_list_constituent_get(
+    constituent_id: str, include_inactive: bool = False
+) -> CollectionOfAddresses | httpx.Response:
+    url = f"https://api.sky.blackbaud.com/constituent/v1/constituents/{constituent_id}/addresses"
+    if include_inactive:
+        url = f"{url}?include_inactive=true"
+
+    return await api_request(
+        method=HttpMethods.GET, url=url, response_model=CollectionOfAddresses
+    )
+
+
+async def attachment_post(attachment: Attachment) -> PostResponse | httpx.Response:
+    return await api_request(
+        method=HttpMethods.POST,
+        url="https://api.sky.blackbaud.com/constituent/v1/constituents/attachments",
+        data=attachment.model_dump_json(exclude_none=True),
+        response_model=PostResponse,
+    )
+
+
+async def constituent_get(constituent_id: str) -> Constituent | httpx.Response:
+    return await api_request(
+        method=HttpMethods.GET,
+        url=f"https://api.sky.blackbaud.com/constituent/v1/constituents/{constituent_id}",
+        response_model=Constituent,
+    )
+
+
+async def constituent_list_get(
+    query: ConstituentListQuery,
+) -> CollectionOfConstituents | Collection | httpx.Response:
+    params = query.model_dump(mode="json", exclude_none=True)
+    if query.fields:
+        params["fields"] = ",".join(query.fields)
+    return await api_request(
+        method=HttpMethods.GET,
+        url="https://api.sky.blackbaud.com/constituent/v1/constituents",
+        params=params,
+        response_model=projected_collection(Constituent, query.fields)
+        if query.fields
+        else CollectionOfConstituents,
+    )
+
+
+async def constituent_search_get(
+    query: ConstituentSearchQuery,
+) -> CollectionOfConstituentSearchResults | httpx.Response:
+    return await api_request(
+        method=HttpMethods.GET,
+        url="https://api.sky.blackbaud.com/constituent/v1/constituents/search",
+        response_model=CollectionOfConstituentSearchResults,
+        params=query.model_dump(exclude_none=True),
+    )
+
+
+async def constituent_patch(constituent: Constituent) -> httpx.Response:
+    return await api_request(
+        method=HttpMethods.PATCH,
+        url=f"https://api.sky.blackbaud.com/constituent/v1/constituents/{constituent.id}",
+        data=await write_json(constituent, exclude_none=True),
+    )
+
+
+async def document_post(request: NewDocumentInfo) -> FileDefinition | httpx.Response:
+    return await api_request(
+        method=HttpMethods.POST,
+        url="https://api.sky.blackbaud.com/constituent/v1/documents",
+        data=request.model_dump_json(exclude_none=True),
+        response_model=FileDefinition,
+    )
+
+
+async def email_list_all_get(**kwargs) -> CollectionOfEmails | httpx.Response:
+    return await api_request(
+        method=HttpMethods.GET,
+        url="https://api.sky.blackbaud.com/constituent/v1/emailaddresses",
+        response_model=CollectionOfEmails,
+        **kwargs,
+    )
+
+
+async def email_list_constituent_get(
+    constituent_id: str,
+) -> CollectionOfEmails | httpx.Response:
+    return await api_request(
+        method=HttpMethods.GET,
+        url=f"https://api.sky.blackbaud.com/constituent/v1/constituents/{constituent_id}/emailaddresses",
+        response_model=CollectionOfEmails,
+    )
+
+
+async def email_delete(email: Email) -> httpx.Response:
+    return await api_request(
+        method=HttpMethods.DELETE,
+        url=f"https://api.sky.blackbaud.com/constituent/v1/emailaddresses/{email.id}",
+    )
+
+
+async def phone_list_constituent_get(
+    constituent_id: str,
+) -> CollectionOfPhones | httpx.Response:
+    return await api_request(
+        method=HttpMethods.GET,
+        url=f"https://api.sky.blackbaud.com/constituent/v1/constituents/{constituent_id}/phones",
+        response_model=CollectionOfPhones,
+    )
+
+
+async def phone_delete(phone: Phone) -> httpx.Response:
+    return await api_request(
+        method=HttpMethods.DELETE,
+        url=f"https://api.sky.blackbaud.com/constituent/v1/phones/{phone.id}",
+    )
+
+
+async def alias_list_constituent_get(
+    constituent_id: str, include_inactive: bool = False
+) -> CollectionOfAliases | httpx.Response:
+    url = f"https://api.sky.blackbaud.com/constituent/v1/constituents/{constituent_id}/aliases"
+    if include_inactive:
+        url = f"{url}?include_inactive=true"
+
+    return await api_request(
+        method=HttpMethods.GET, url=url, response_model=CollectionOfAliases
+    )
+
+
+async def alias_collection_post(
+    aliases: CollectionOfAliases,
+) -> CollectionOfStrings | httpx.Response:
+    return await api_request(
+        method=HttpMethods.POST,
+        url="https://api.sky.blackbaud.com/constituent/v1/aliases",
+        response_model=CollectionOfStrings,
+        data=aliases.model_dump_json(exclude_none=True),
+    )
+
+
+async def alias_patch(alias: Alias) -> httpx.Response:
+    return await api_request(
+        method=HttpMethods.PATCH,
+        url=f"https://api.sky.blackbaud.com/constituent/v1/aliases/{alias.id}",
+        data=alias.model_dump_json(exclude_none=True, exclude={"id", "constituent_id"}),
+    )
+
+
+async def alias_delete(alias: Alias) -> httpx.Response:
+    return await api_request(
+        method=HttpMethods.DELETE,
+        url=f"https://api.sky.blackbaud.com/constituent/v1/aliases/{alias.id}",
+    )
+
+
+async def relationship_list_constituent_get(
+    constituent_id: str,
+) -> CollectionOfRelationships | httpx.Response:
+    return await api_request(
+        method=HttpMethods.GET,
+        url=f"https://api.sky.blackbaud.com/constituent/v1/constituents/{constituent_id}/relationships",
+        response_model=CollectionOfRelationships,
+    )
+
+
+async def relationship_patch(relationship: Relationship) -> httpx.Response:
+    return await api_request(
+        method=HttpMethods.PATCH,
+        url=f"https://api.sky.blackbaud.com/constituent/v1/relationships/{relationship.id}",
+        data=await write_json(
+            relationship, exclude_none=True, exclude={"id", "constituent_id"}
+        ),
+    )
+
+
+async def relationship_delete(relationship: Relationship) -> httpx.Response:
+    return await api_request(
+        method=HttpMethods.DELETE,
+        url=f"https://api.sky.blackbaud.com/constituent/v1/relationships/{relationship.id}",
+    )
+
+
+async def note_post(note: Note) -> Note | httpx.Response:
+    response = await api_request(
+        method=HttpMethods.POST,
+        url="https://api.sky.blackbaud.com/constituent/v1/notes",
+        data=note.model_dump_json(exclude_none=True),
+    )
+    match response.status_code:
+        case 200:
+            if response.json()["id"]:
+                note.id = response.json()["id"]
+            return note
+        case _:
+            return response
+
+
+async def note_list_constituent_get(
+    constituent_id: str,
+) -> CollectionOfNotes | httpx.Response:
+    return await api_request(
+        method=HttpMethods.GET,
+        url=f"https://api.sky.blackbaud.com/constituent/v1/constituents/{constituent_id}/notes",
+        response_model=CollectionOfNotes,
+    )
+
+
+async def name_format_get(name_format_id: str) -> NameFormat | httpx.Response:
+    return await api_request(
+        method=HttpMethods.GET,
+        url=f"https://api.sky.blackbaud.com/constituent/v1/constituents/nameformats/{name_format_id}",
+        response_model=NameFormat,
+    )
+
+
+async def name_format_patch(
+    name_format_id: str, name: NameFormatEdit
+) -> httpx.Response:
+    return await api_request(
+        method=HttpMethods.PATCH,
+        url=f"https://api.sky.blackbaud.com/constituent/v1/nameformats/{name_format_id}",
+        data=name.model_dump_json(exclude_none=True),
+    )
+
+
+async def name_format_primary_patch(
+    primary_name_format_id: str, name: PrimaryNameFormatEdit
+) -> httpx.Response:
+    return await api_request(
+        method=HttpMethods.PATCH,
+        url=f"https://api.sky.blackbaud.com/constituent/v1/primarynameformats/{primary_name_format_id}",
+        data=name.model_dump_json(exclude_none=True),
+    )
+
+
+async def name_format_summary_get(
+    constituent_id: str,
+) -> NameFormatSummary | httpx.Response:
+    return await api_request(
+        method=HttpMethods.GET,
+        url=f"https://api.sky.blackbaud.com/constituent/v1/constituents/{constituent_id}/nameformats/summary",
+        response_model=NameFormatSummary,
+    )
@@ -1 +1,330 @@
-# TODO add preview Code Table API
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, TypeVar
+
+from pydantic import BaseModel
+from requests import HTTPError, Response
+
+from ..util import (
+    Collection,
+    HttpMethods,
+    api_request,
+    base_model,
+    configure_write_check,
+)
+
+logger = logging.getLogger(__name__)
+
+# seconds to wait after a failed refresh before the next attempt
+_RETRY_AFTER = 60.0
+
+M = TypeVar("M", bound=BaseModel)
+
+
+class CodeTable(BaseModel):
+    code_tables_id: int
+    name: str
+    active: bool | None = None
+    long_description: str | None = None
+    short_description: str | None = None
+
+
+class TableEntry(BaseModel):
+    table_entries_id: int | None = None
+    code_tables_id: int | None = None
+    description: str
+    short_description: str | None = None
+    active: bool | None = None
+    sequence: int | None = None
+
+
+class CollectionOfCodeTables(Collection[CodeTable]):
+    pass
+
+
+class CollectionOfTableEntries(Collection[TableEntry]):
+    pass
+
+
+def code_table_list_get(limit: int = 1000) -> CollectionOfCodeTables | Response:
+    return api_request(
+        method=HttpMethods.GET,
+        url="https://api.sky.blackbaud.com/codetables/v1/codetables",
+        params={"limit": limit},
+        response_model=CollectionOfCodeTables,
+    )
+
+
+def table_entry_list_get(
+    code_table_id: int, include_inactive: bool = True, limit: int = 1000
+) -> CollectionOfTableEntries | Response:
+    return api_request(
+        method=HttpMethods.GET,
+        url=f"https://api.sky.blackbaud.com/codetables/v1/codetables/{code_table_id}/tableentries",
+        params={"include_inactive": str(include_inactive).lower(), "limit": limit},
+        response_model=CollectionOfTableEntries,
+    )
+
+
+# model fields holding code-table values, by model class name (projections
+# go by the model they were made from); RE keeps email address types in the
+# phone types table
+FIELD_TABLES: dict[str, dict[str, str]] = {
+    "Address": {"type": "Address Types"},
+    "Phone": {"type": "Phone Types"},
+    "Email": {"type": "Phone Types"},
+    "Constituent": {
+        "gender": "Gender",
+        "marital_status": "Marital Status",
+        "suffix": "Suffixes",
+        "suffix_2": "Suffixes",
+        "title": "Titles",
+        "title_2": "Titles",
+    },
+    "Relationship": {"type": "Relationships", "reciprocal_type": "Relationships"},
+}
+
+
+@dataclass
+class CodeTableViolation:
+    model: str
+    field: str
+    table: str
+    value: str
+    # the entry exists but is inactive
+    inactive: bool = False
+
+    def __str__(self) -> str:
+        reason = "is inactive in" if self.inactive else "is not in"
+        return f"{self.model}.{self.field} {self.value!r} {reason} {self.table!r}"
+
+
+class CodeTableError(ValueError):
+    def __init__(self, violations: list[CodeTableViolation]) -> None:
+        super().__init__("; ".join(str(v) for v in violations))
+        self.violations = violations
+
+
+@dataclass
+class _Table:
+    # each active entry mapped to its interned self
+    active: dict[str, str]
+    inactive: frozenset[str]
+    # casefolded spelling -> interned active spelling
+    folded: dict[str, str]
+
+    @classmethod
+    def build(cls, active: list[str], inactive: list[str]) -> "_Table":
+        interned = {v: v for v in map(sys.intern, active)}
+        return cls(
+            active=interned,
+            inactive=frozenset(inactive) - interned.keys(),
+            folded={v.casefold(): v for v in interned},
+        )
+
+
+def _fetch_entries(table: CodeTable) -> tuple[str, list[str], list[str]]:
+    page = table_entry_list_get(table.code_tables_id)
+    if isinstance(page, Response):
+        raise HTTPError(
+            f"{page.status_code} fetching code table {table.name!r}", response=page
+        )
+    active, inactive = [], []
+    for entry in page.iter_all(prefetch=0):
+        (inactive if entry.active is False else active).append(entry.description)
+    return table.name, active, inactive
+
+
+class CodeTableCache:
+    """Every RE code table, loaded in one go and refreshed after `ttl` seconds.
+
+    Table entries are interned, so models normalized against the cache
+    share one string per value. With `path` the tables are also kept in a
+    JSON file and a new process starts from it while it is younger than
+    `ttl`. If a refresh fails the previous tables stay in use.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 12 * 3600,
+        path: str | os.PathLike | None = None,
+        workers: int = 8,
+        field_tables: dict[str, dict[str, str]] | None = None,
+    ) -> None:
+        self.ttl = ttl
+        self.path = Path(path) if path else None
+        self.workers = workers
+        self.field_tables = field_tables or FIELD_TABLES
+        self.loaded_at = 0.0
+        self._tables: dict[str, _Table] = {}
+        self._lock = threading.Lock()
+        if self.path is not None:
+            self._read()
+
+    def _read(self) -> None:
+        try:
+            saved = json.loads(self.path.read_text())
+            self._install(saved["tables"], saved["loaded_at"])
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _write(self, tables: dict[str, dict[str, list[str]]]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"loaded_at": self.loaded_at, "tables": tables}, f)
+        os.replace(tmp, self.path)
+
+    def _install(
+        self, tables: dict[str, dict[str, list[str]]], loaded_at: float
+    ) -> None:
+        self._tables = {
+            sys.intern(name): _Table.build(t["active"], t["inactive"])
+            for name, t in tables.items()
+        }
+        self.loaded_at = loaded_at
+
+    def load(self) -> None:
+        """Fetch all code tables and their entries, a table per request."""
+        tables = code_table_list_get()
+        if isinstance(tables, Response):
+            raise HTTPError(
+                f"{tables.status_code} listing code tables", response=tables
+            )
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            fetched = pool.map(_fetch_entries, tables.iter_all(prefetch=0))
+            raw = {
+                name: {"active": active, "inactive": inactive}
+                for name, active, inactive in fetched
+            }
+        self._install(raw, time.time())
+        if self.path is not None:
+            self._write(raw)
+
+    def _fresh(self) -> dict[str, _Table]:
+        if time.time() - self.loaded_at >= self.ttl:
+            with self._lock:
+                # another thread may have refreshed while we waited
+                if time.time() - self.loaded_at >= self.ttl:
+                    try:
+                        self.load()
+                    except (HTTPError, OSError):
+                        if not self._tables:
+                            raise
+                        logger.warning("code table refresh failed", exc_info=True)
+                        # keep the old tables a while before trying again
+                        self.loaded_at = time.time() - self.ttl + _RETRY_AFTER
+        return self._tables
+
+    def tables(self) -> list[str]:
+        return sorted(self._fresh())
+
+    def entries(self, table: str, include_inactive: bool = False) -> frozenset[str]:
+        t = self._fresh()[table]
+        active = frozenset(t.active)
+        return active | t.inactive if include_inactive else active
+
+    def canonical(self, table: str, value: str) -> str | None:
+        """The active entry matching `value` ignoring case, or None."""
+        t = self._fresh().get(table)
+        if t is None:
+            return None
+        return t.active.get(value) or t.folded.get(value.casefold())
+
+    def _check(self, model: BaseModel, fix: bool) -> Iterator[CodeTableViolation]:
+        tables = self._fresh()
+        name = base_model(type(model)).__name__
+        for field, table_name in self.field_tables.get(name, {}).items():
+            value = getattr(model, field, None)
+            table = tables.get(table_name)
+            if not isinstance(value, str) or table is None:
+                continue
+            canonical = table.active.get(value)
+            if canonical is None and fix:
+                canonical = table.folded.get(value.casefold())
+            if canonical is not None:
+                if fix:
+                    setattr(model, field, canonical)
+                continue
+            yield CodeTableViolation(
+                model=name,
+                field=field,
+                table=table_name,
+                value=value,
+                inactive=value in table.inactive,
+            )
+        # nested records such as Constituent.address
+        for field in type(model).model_fields:
+            value = getattr(model, field, None)
+            for item in value if isinstance(value, list) else [value]:
+                if isinstance(item, BaseModel):
+                    yield from self._check(item, fix)
+
+    def validate(self, model: BaseModel) -> list[CodeTableViolation]:
+        """Code-table values of the model and its nested records that RE
+        would reject; tables the cache does not know are not checked."""
+        return list(self._check(model, fix=False))
+
+    def normalize(self, model: BaseModel) -> list[CodeTableViolation]:
+        """validate, first rewriting case-only mismatches to the interned
+        table spelling."""
+        return list(self._check(model, fix=True))
+
+    def check(self, model: M) -> M:
+        """Raise CodeTableError unless every code-table value is valid."""
+        if violations := self.validate(model):
+            raise CodeTableError(violations)
+        return model
+
+    def validating(self, operation: Callable[[M], BaseModel | Response]):
+        """Wrap a write such as address_post so invalid models never leave.
+
+        The wrapped call raises CodeTableError instead of sending. To check
+        every write helper instead, see configure_code_tables.
+        """
+
+        def send(model: M) -> BaseModel | Response:
+            return operation(self.check(model))
+
+        return send
+
+
+_cache: CodeTableCache | None = None
+_cache_lock = threading.Lock()
+
+
+def configure_code_tables(
+    ttl: float = 12 * 3600,
+    path: str | os.PathLike | None = None,
+    workers: int = 8,
+    check_writes: bool = False,
+) -> CodeTableCache:
+    """Replace the process-wide code table cache.
+
+    With `check_writes` the write helpers (address_post, constituent_patch
+    and the like) raise CodeTableError before sending a model holding a
+    value RE would reject.
+    """
+    global _cache
+    with _cache_lock:
+        _cache = CodeTableCache(ttl=ttl, path=path, workers=workers)
+    if check_writes:
+        configure_write_check(_cache.check)
+    return _cache
+
+
+def get_code_tables() -> CodeTableCache:
+    """The process-wide cache, created on first use and loaded lazily."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CodeTableCache()
+        return _cache
@@ -1,11 +1,30 @@
+import hashlib
+import mimetypes
+import mmap
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime
 from enum import StrEnum
-from typing import Annotated, Union
+from typing import Annotated, BinaryIO, Iterable, Iterator, Union
 
 from pydantic import BaseModel, Field
-from requests import Response
-
-from ..util import Collection, ContentType, FuzzyDate, HttpMethods, api_request
+from requests import HTTPError, Response
+from requests.utils import super_len
+
+from ..bulk import MAX_PAGE_SIZE, Checkpoint, MutationResult, bulk_list, bulk_mutate
+from ..decode import DecodeMode
+from ..util import (
+    Collection,
+    ContentType,
+    FuzzyDate,
+    HttpMethods,
+    api_request,
+    projected_collection,
+    write_json,
+)
 
 
 class Address(BaseModel):
@@ -267,25 +286,86 @@ class RequestMetaData(BaseModel):
     url: str
 
 
+# str is the file's content, as before; pass a pathlib.Path for a file on disk
+UploadSource = str | bytes | bytearray | memoryview | mmap.mmap | os.PathLike | BinaryIO
+
+
+def _source_name(data: UploadSource) -> str | None:
+    if isinstance(data, os.PathLike):
+        return os.path.basename(os.fspath(data))
+    name = getattr(data, "name", None)
+    return os.path.basename(name) if isinstance(name, str) else None
+
+
+@contextmanager
+def _upload_body(
+    data: UploadSource, content_type: str | None
+) -> Iterator[tuple[object, dict[str, str]]]:
+    opened = None
+    match data:
+        case str():
+            body = data.encode()
+        case os.PathLike():
+            opened = body = open(data, "rb")
+        case memoryview():
+            body = data.cast("B")
+        case _:
+            # bytes and mmaps are sent as they are, file objects are read in
+            # blocks by urllib3 so the file never sits in memory whole
+            body = data
+    name = _source_name(data)
+    try:
+        yield (
+            body,
+            {
+                "Content-Type": content_type
+                or (name and mimetypes.guess_type(name)[0])
+                or "application/octet-stream",
+                "Content-Length": str(super_len(body)),
+            },
+        )
+    finally:
+        if opened is not None:
+            opened.close()
+
+
+def _upload(
+    request: RequestMetaData, data: UploadSource, content_type: str | None
+) -> Response:
+    with _upload_body(data, content_type) as (body, headers):
+        return api_request(
+            method=request.method,
+            url=request.url,
+            headers={h.name: h.value for h in request.headers if h.name and h.value}
+            | headers,
+            data=body,
+            drop_headers=True,
+        )
+
+
 class FileDefinition(BaseModel):
     file_id: str | None = None
     file_upload_request: RequestMetaData
     thumbnail_id: str | None = None
     thumbnail_upload_request: RequestMetaData | None = None
 
-    # TODO: This does not handle thumbnails at all.
-    # FIXME: We don't handle the content type header.
-    def upload_binary(self, data: str, content_type: ContentType) -> Response:
-        self.file_upload_request.headers.append(
-            Header(name="Content-Type", value=content_type)
-        )
-        return api_request(
-            method=self.file_upload_request.method,
-            url=self.file_upload_request.url,
-            headers=self.file_upload_request.headers,
-            data=data,
-            drop_headers=True
-        )
+    def upload_binary(
+        self, data: UploadSource, content_type: ContentType | str | None = None
+    ) -> Response:
+        """Stream the document to its pre-signed upload URL.
+
+        Paths and file objects are streamed from the current position with
+        an explicit Content-Length; the Content-Type is guessed from the
+        file name when not given. Retries rewind seekable sources.
+        """
+        return _upload(self.file_upload_request, data, content_type)
+
+    def upload_thumbnail(
+        self, data: UploadSource, content_type: ContentType | str | None = None
+    ) -> Response:
+        if self.thumbnail_upload_request is None:
+            raise ValueError("no thumbnail upload, post with upload_thumbnail=True")
+        return _upload(self.thumbnail_upload_request, data, content_type)
 
 
 class CollectionOfAddresses(Collection[Address]):
@@ -328,7 +408,7 @@ def address_post(address: Address) -> Address | Response:
     response = api_request(
         method=HttpMethods.POST,
         url="https://api.sky.blackbaud.com/constituent/v1/addresses",
-        data=address.model_dump_json(exclude_none=True),
+        data=write_json(address, exclude_none=True),
     )
     match response.status_code:
         case 200:
@@ -343,7 +423,7 @@ def address_patch(address: Address) -> Response:
     return api_request(
         method=HttpMethods.PATCH,
         url=f"https://api.sky.blackbaud.com/constituent/v1/addresses/{address.id}",
-        data=address.model_dump_json(exclude_none=True),
+        data=write_json(address, exclude_none=True),
     )
 
 
@@ -366,6 +446,15 @@ def address_list_constituent_get(
     )
 
 
+def address_list_all_get(**kwargs) -> CollectionOfAddresses | Response:
+    return api_request(
+        method=HttpMethods.GET,
+        url="https://api.sky.blackbaud.com/constituent/v1/addresses",
+        response_model=CollectionOfAddresses,
+        **kwargs,
+    )
+
+
 def attachment_post(attachment: Attachment) -> PostResponse | Response:
     return api_request(
         method=HttpMethods.POST,
@@ -385,12 +474,39 @@ def constituent_get(constituent_id: str) -> Constituent | Response:
 
 def constituent_list_get(
     query: ConstituentListQuery,
-) -> CollectionOfConstituents | Response:
+    decode_mode: DecodeMode | None = None,
+) -> CollectionOfConstituents | Collection | Response:
+    """List constituents; with query.fields set the server sends only those
+    fields and the page parses into a slim projected_model(Constituent, ...)."""
+    params = query.model_dump(mode="json", exclude_none=True)
+    if query.fields:
+        params["fields"] = ",".join(query.fields)
     return api_request(
         method=HttpMethods.GET,
         url="https://api.sky.blackbaud.com/constituent/v1/constituents",
-        params=query.model_dump(exclude_none=True),
-        response_model=CollectionOfConstituents,
+        # json mode sends datetimes such as last_modified as ISO 8601
+        params=params,
+        response_model=projected_collection(Constituent, query.fields)
+        if query.fields
+        else CollectionOfConstituents,
+        decode_mode=decode_mode,
+    )
+
+
+def constituent_list_bulk_get(
+    query: ConstituentListQuery,
+    workers: int = 8,
+    ordered: bool = True,
+) -> Iterator[Constituent]:
+    page_size = query.limit or MAX_PAGE_SIZE
+    return bulk_list(
+        fetch=lambda offset, limit: constituent_list_get(
+            query.model_copy(update={"offset": offset, "limit": limit})
+        ),
+        page_size=page_size,
+        workers=workers,
+        ordered=ordered,
+        start=query.offset or 0,
     )
 
 
@@ -409,7 +525,7 @@ def constituent_patch(constituent: Constituent) -> Response:
     return api_request(
         method=HttpMethods.PATCH,
         url=f"https://api.sky.blackbaud.com/constituent/v1/constituents/{constituent.id}",
-        data=constituent.model_dump_json(exclude_none=True),
+        data=write_json(constituent, exclude_none=True),
     )
 
 
@@ -422,6 +538,104 @@ def document_post(request: NewDocumentInfo) -> FileDefinition | Response:
     )
 
 
+@dataclass
+class DocumentUpload:
+    parent_id: str
+    source: UploadSource
+    # defaults to the source's file name
+    file_name: str | None = None
+    # attachment display name, defaults to file_name
+    name: str | None = None
+    content_type: ContentType | str | None = None
+    thumbnail: UploadSource | None = None
+    thumbnail_content_type: ContentType | str | None = None
+    tags: list[str] | None = None
+
+
+def upload_document(upload: DocumentUpload) -> PostResponse | Response:
+    """document_post, stream the file (and thumbnail), then attachment_post."""
+    file_name = upload.file_name or _source_name(upload.source)
+    definition = document_post(
+        NewDocumentInfo(
+            file_name=file_name, upload_thumbnail=upload.thumbnail is not None
+        )
+    )
+    if isinstance(definition, Response):
+        return definition
+    response = definition.upload_binary(upload.source, upload.content_type)
+    if not response.ok:
+        return response
+    if upload.thumbnail is not None:
+        response = definition.upload_thumbnail(
+            upload.thumbnail, upload.thumbnail_content_type
+        )
+        if not response.ok:
+            return response
+    return attachment_post(
+        Attachment(
+            parent_id=upload.parent_id,
+            file_id=definition.file_id,
+            file_name=file_name,
+            name=upload.name or file_name,
+            thumbnail_id=definition.thumbnail_id
+            if upload.thumbnail is not None
+            else None,
+            tags=upload.tags,
+            type=AttachmentType.PHYSICAL,
+        )
+    )
+
+
+def upload_documents(
+    uploads: Iterable[DocumentUpload],
+    workers: int = 8,
+    checkpoint: Checkpoint | str | os.PathLike | None = None,
+) -> Iterator[MutationResult]:
+    """Run upload_document over many files on a pool of `workers` threads.
+
+    Each worker streams its own file, so memory stays at a few buffers per
+    worker however large the documents are. Results come back as they
+    complete with the attachment id; with a checkpoint a rerun skips the
+    files that were already attached. Files are keyed by parent, resolved
+    path and size, in-memory sources by a hash of their content.
+    """
+    return bulk_mutate(
+        uploads,
+        upload_document,
+        workers=workers,
+        checkpoint=checkpoint,
+        key=lambda index, upload: _upload_key(upload),
+    )
+
+
+def _source_identity(data: UploadSource) -> str:
+    # files are told apart by where they live and how big they are, a bare
+    # name is not enough when two directories hold a file of the same name
+    path = os.fspath(data) if isinstance(data, os.PathLike) else None
+    if path is None and isinstance(getattr(data, "name", None), str):
+        path = data.name if os.path.exists(data.name) else None
+    if path is not None:
+        return f"{os.path.realpath(path)}:{os.path.getsize(path)}"
+    # in-memory and unnamed sources by content
+    digest = hashlib.sha256()
+    match data:
+        case str():
+            digest.update(data.encode())
+        case bytes() | bytearray() | memoryview() | mmap.mmap():
+            digest.update(data)
+        case _:
+            start = data.tell()
+            for block in iter(lambda: data.read(1 << 20), b""):
+                digest.update(block)
+            data.seek(start)
+    return f"sha256:{digest.hexdigest()}"
+
+
+def _upload_key(upload: DocumentUpload) -> str:
+    key = f"{upload.parent_id}:{_source_identity(upload.source)}"
+    return f"{key}:{upload.file_name}" if upload.file_name else key
+
+
 def email_list_all_get(**kwargs) -> CollectionOfEmails | Response:
     return api_request(
         method=HttpMethods.GET,
@@ -431,6 +645,22 @@ def email_list_all_get(**kwargs) -> CollectionOfEmails | Response:
     )
 
 
+def email_list_all_bulk_get(
+    page_size: int = MAX_PAGE_SIZE,
+    workers: int = 8,
+    ordered: bool = True,
+    params: dict | None = None,
+) -> Iterator[Email]:
+    return bulk_list(
+        fetch=lambda offset, limit: email_list_all_get(
+            params={**(params or {}), "offset": offset, "limit": limit}
+        ),
+        page_size=page_size,
+        workers=workers,
+        ordered=ordered,
+    )
+
+
 def email_list_constituent_get(
     constituent_id: str,
 ) -> CollectionOfEmails | Response:
@@ -458,6 +688,15 @@ def phone_list_constituent_get(
     )
 
 
+def phone_list_all_get(**kwargs) -> CollectionOfPhones | Response:
+    return api_request(
+        method=HttpMethods.GET,
+        url="https://api.sky.blackbaud.com/constituent/v1/phones",
+        response_model=CollectionOfPhones,
+        **kwargs,
+    )
+
+
 def phone_delete(phone: Phone) -> Response:
     return api_request(
         method=HttpMethods.DELETE,
@@ -519,8 +758,8 @@ def relationship_patch(relationship: Relationship) -> Response:
     return api_request(
         method=HttpMethods.PATCH,
         url=f"https://api.sky.blackbaud.com/constituent/v1/relationships/{relationship.id}",
-        data=relationship.model_dump_json(
-            exclude_none=True, exclude={"id", "constituent_id"}
+        data=write_json(
+            relationship, exclude_none=True, exclude={"id", "constituent_id"}
         ),
     )
 
@@ -591,3 +830,97 @@ def name_format_summary_get(
         url=f"https://api.sky.blackbaud.com/constituent/v1/constituents/{constituent_id}/nameformats/summary",
         response_model=NameFormatSummary,
     )
+
+
+class ProfileInclude(StrEnum):
+    ADDRESSES = "addresses"
+    EMAILS = "emails"
+    PHONES = "phones"
+    RELATIONSHIPS = "relationships"
+    ALIASES = "aliases"
+    NOTES = "notes"
+
+
+class ConstituentProfile(BaseModel):
+    id: str
+    constituent: Constituent | None = None
+    addresses: list[Address] | None = None
+    emails: list[Email] | None = None
+    phones: list[Phone] | None = None
+    relationships: list[Relationship] | None = None
+    aliases: list[Alias] | None = None
+    notes: list[Note] | None = None
+    # status code per part that could not be fetched, "constituent" included
+    errors: dict[str, int] = Field(default_factory=dict)
+
+
+_PROFILE_FETCHERS = {
+    ProfileInclude.ADDRESSES: address_list_constituent_get,
+    ProfileInclude.EMAILS: email_list_constituent_get,
+    ProfileInclude.PHONES: phone_list_constituent_get,
+    ProfileInclude.RELATIONSHIPS: relationship_list_constituent_get,
+    ProfileInclude.ALIASES: alias_list_constituent_get,
+    ProfileInclude.NOTES: note_list_constituent_get,
+}
+
+
+def _profile_part(part: ProfileInclude, constituent_id: str) -> list | Response:
+    page = _PROFILE_FETCHERS[part](constituent_id)
+    if isinstance(page, Response):
+        return page
+    try:
+        return list(page.iter_all(prefetch=0))
+    except HTTPError as e:
+        return e.response
+
+
+def fetch_profiles(
+    constituent_ids: Iterable[str],
+    include: Iterable[ProfileInclude] | None = None,
+    workers: int = 16,
+) -> Iterator[ConstituentProfile]:
+    """Fetch constituents with their sub-resources, in input order.
+
+    Every constituent_get and sub-resource list call runs on one pool of
+    `workers` threads, so calls overlap within a constituent and across
+    constituents while the total in flight stays bounded. At most
+    `workers * 2` profiles are being assembled at any time.
+    """
+    parts = list(ProfileInclude) if include is None else list(include)
+    ids = iter(constituent_ids)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending: deque[tuple[str, Future, dict[ProfileInclude, Future]]] = deque()
+
+        def fill() -> None:
+            while len(pending) < workers * 2:
+                constituent_id = next(ids, None)
+                if constituent_id is None:
+                    return
+                pending.append(
+                    (
+                        constituent_id,
+                        pool.submit(constituent_get, constituent_id),
+                        {
+                            part: pool.submit(_profile_part, part, constituent_id)
+                            for part in parts
+                        },
+                    )
+                )
+
+        fill()
+        while pending:
+            constituent_id, head, futures = pending.popleft()
+            profile = ConstituentProfile(id=constituent_id)
+            constituent = head.result()
+            if isinstance(constituent, Response):
+                profile.errors["constituent"] = constituent.status_code
+            else:
+                profile.constituent = constituent
+            for part, future in futures.items():
+                result = future.result()
+                if isinstance(result, Response):
+                    profile.errors[part] = result.status_code
+                else:
+                    setattr(profile, part, result)
+            fill()
+            yield profile
@@ -1 +1,242 @@
-# TODO add Gift API
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from enum import StrEnum
+from typing import Annotated, Iterator, Union
+
+from pydantic import BaseModel, Field
+from requests import HTTPError, Response
+
+from ..bulk import MAX_PAGE_SIZE, bulk_list
+from ..decode import DecodeMode
+from ..util import Collection, FuzzyDate, HttpMethods, api_request
+
+
+class GiftType(StrEnum):
+    DONATION = "Donation"
+    GIFT_IN_KIND = "GiftInKind"
+    MATCHING_GIFT_PAYMENT = "MatchingGiftPayment"
+    MATCHING_GIFT_PLEDGE = "MatchingGiftPledge"
+    MATCHING_GIFT_WRITE_OFF = "MatchingGiftWriteOff"
+    OTHER = "Other"
+    PLEDGE = "Pledge"
+    PLEDGE_PAYMENT = "PledgePayment"
+    PLEDGE_WRITE_OFF = "PledgeWriteOff"
+    RECURRING_GIFT = "RecurringGift"
+    RECURRING_GIFT_PAYMENT = "RecurringGiftPayment"
+    STOCK = "Stock"
+    SOLD_STOCK = "SoldStock"
+
+
+class CurrencyValue(BaseModel):
+    value: float
+
+
+class GiftSplit(BaseModel):
+    id: str | None = None
+    amount: CurrencyValue | None = None
+    appeal_id: str | None = None
+    campaign_id: str | None = None
+    fund_id: str | None = None
+    package_id: str | None = None
+
+
+class GiftPayment(BaseModel):
+    payment_method: str | None = None
+    account_token: str | None = None
+    check_date: FuzzyDate | None = None
+    check_number: str | None = None
+    reference: str | None = None
+    reference_date: FuzzyDate | None = None
+
+
+class GiftReceipt(BaseModel):
+    amount: CurrencyValue | None = None
+    date: datetime | None = None
+    number: int | None = None
+    status: str | None = None
+
+
+class GiftAcknowledgement(BaseModel):
+    date: datetime | None = None
+    letter: str | None = None
+    status: str | None = None
+
+
+class GiftSoftCredit(BaseModel):
+    id: str | None = None
+    amount: CurrencyValue | None = None
+    constituent_id: str | None = None
+    gift_id: str | None = None
+
+
+class GiftFundraiser(BaseModel):
+    amount: CurrencyValue | None = None
+    constituent_id: str | None = None
+
+
+class Gift(BaseModel):
+    id: str | None = None
+    amount: CurrencyValue | None = None
+    constituent_id: str | None = None
+    acknowledgements: list[GiftAcknowledgement] | None = None
+    batch_number: str | None = None
+    constituency: str | None = None
+    date: datetime | None = None
+    date_added: datetime | None = None
+    date_modified: datetime | None = None
+    fundraisers: list[GiftFundraiser] | None = None
+    gift_aid_amount: CurrencyValue | None = None
+    gift_aid_qualification_status: str | None = None
+    gift_splits: list[GiftSplit] | None = None
+    gift_status: str | None = None
+    is_anonymous: bool | None = None
+    linked_gifts: list[str] | None = None
+    lookup_id: str | None = None
+    origin: str | None = None
+    payments: list[GiftPayment] | None = None
+    post_date: datetime | None = None
+    post_status: str | None = None
+    receipts: list[GiftReceipt] | None = None
+    reference: str | None = None
+    soft_credits: list[GiftSoftCredit] | None = None
+    subtype: str | None = None
+    type: str | None = None
+
+
+class GiftListQuery(BaseModel):
+    acknowledgement_status: list[str] | None = None
+    appeal_id: list[str] | None = None
+    campaign_id: list[str] | None = None
+    constituent_id: list[str] | None = None
+    date_added: datetime | None = None
+    fund_id: list[str] | None = None
+    gift_type: list[str] | None = None
+    last_modified: datetime | None = None
+    list_id: str | None = None
+    post_status: list[str] | None = None
+    receipt_status: list[str] | None = None
+    start_gift_amount: float | None = None
+    end_gift_amount: float | None = None
+    start_gift_date: date | None = None
+    end_gift_date: date | None = None
+    sort_token: str | None = None
+    sort: list[str] | None = None
+    limit: Union[Annotated[int, Field(ge=1, le=5000)], None] = None
+    offset: int | None = None
+
+
+class CollectionOfGifts(Collection[Gift]):
+    pass
+
+
+def gift_get(gift_id: str) -> Gift | Response:
+    return api_request(
+        method=HttpMethods.GET,
+        url=f"https://api.sky.blackbaud.com/gift/v1/gifts/{gift_id}",
+        response_model=Gift,
+    )
+
+
+def gift_list_get(
+    query: GiftListQuery,
+    decode_mode: DecodeMode | None = None,
+) -> CollectionOfGifts | Response:
+    return api_request(
+        method=HttpMethods.GET,
+        url="https://api.sky.blackbaud.com/gift/v1/gifts",
+        # json mode sends the gift date range as ISO 8601 dates
+        params=query.model_dump(mode="json", exclude_none=True),
+        response_model=CollectionOfGifts,
+        decode_mode=decode_mode,
+    )
+
+
+def gift_list_bulk_get(
+    query: GiftListQuery,
+    workers: int = 8,
+    ordered: bool = True,
+) -> Iterator[Gift]:
+    page_size = query.limit or MAX_PAGE_SIZE
+    return bulk_list(
+        fetch=lambda offset, limit: gift_list_get(
+            query.model_copy(update={"offset": offset, "limit": limit})
+        ),
+        page_size=page_size,
+        workers=workers,
+        ordered=ordered,
+        start=query.offset or 0,
+    )
+
+
+def gift_date_shards(start: date, end: date, days: int = 30) -> list[tuple[date, date]]:
+    """Split the inclusive range start..end into windows of `days` days."""
+    step = timedelta(days=days)
+    shards = []
+    while start <= end:
+        shard_end = min(start + step - timedelta(days=1), end)
+        shards.append((start, shard_end))
+        start = shard_end + timedelta(days=1)
+    return shards
+
+
+def _gift_shard(
+    query: GiftListQuery, start: date, end: date, decode_mode: DecodeMode | None
+) -> list[Gift]:
+    shard = query.model_copy(
+        update={
+            "start_gift_date": start,
+            "end_gift_date": end,
+            "offset": 0,
+            "limit": query.limit or MAX_PAGE_SIZE,
+        }
+    )
+    gifts = []
+    while True:
+        page = gift_list_get(shard, decode_mode=decode_mode)
+        if isinstance(page, Response):
+            raise HTTPError(
+                f"{page.status_code} fetching gifts {start}..{end}", response=page
+            )
+        gifts.extend(page.value)
+        shard.offset += len(page.value)
+        if not page.value or shard.offset >= page.count:
+            return gifts
+
+
+def gift_list_sharded_get(
+    query: GiftListQuery,
+    start: date,
+    end: date,
+    days: int = 30,
+    workers: int = 8,
+    decode_mode: DecodeMode | None = None,
+) -> Iterator[Gift]:
+    """List gifts dated start..end as independent date-range queries.
+
+    Each `days`-long window is its own short offset listing, so no request
+    pages deep into one huge result; windows run on `workers` threads and
+    are yielded in date order with at most `workers * 2` of them held at a
+    time. Pick `days` so a window spans a few pages at most.
+    """
+    shards = iter(gift_date_shards(start, end, days))
+    window = max(workers, 1) * 2
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending: deque[Future] = deque()
+
+        def fill() -> None:
+            while len(pending) < window:
+                shard = next(shards, None)
+                if shard is None:
+                    return
+                pending.append(pool.submit(_gift_shard, query, *shard, decode_mode))
+
+        try:
+            fill()
+            while pending:
+                gifts = pending.popleft().result()
+                fill()
+                yield from gifts
+        finally:
+            for future in pending:
+                future.cancel()
@@ -1 +1,231 @@
-# TODO add Gift Batch API
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import islice
+from typing import Callable, Iterable, Iterator
+
+from pydantic import BaseModel
+from requests import RequestException, Response
+
+from ..bulk import Checkpoint, MutationResult
+from ..util import HttpMethods, api_request
+from .gift import Gift
+
+# gifts per add-gifts request
+MAX_BATCH_SIZE = 100
+
+
+class GiftBatch(BaseModel):
+    id: str | None = None
+    batch_number: str | None = None
+    batch_description: str | None = None
+    batch_template_id: str | None = None
+    approved: bool | None = None
+
+
+class GiftBatchGifts(BaseModel):
+    gifts: list[Gift]
+
+
+class GiftBatchGiftIds(BaseModel):
+    gift_ids: list[str]
+
+
+def gift_batch_post(batch: GiftBatch) -> GiftBatch | Response:
+    response = api_request(
+        method=HttpMethods.POST,
+        url="https://api.sky.blackbaud.com/gift-batch/v1/giftbatches",
+        data=batch.model_dump_json(exclude_none=True),
+    )
+    match response.status_code:
+        case 200:
+            if response.json()["id"]:
+                batch.id = response.json()["id"]
+            return batch
+        case _:
+            return response
+
+
+def gift_batch_gifts_post(
+    batch_id: str, gifts: list[Gift]
+) -> GiftBatchGiftIds | Response:
+    """Add gifts to a batch; the whole request is rejected if one is invalid."""
+    response = api_request(
+        method=HttpMethods.POST,
+        url=f"https://api.sky.blackbaud.com/gift-batch/v1/giftbatches/{batch_id}/gifts",
+        data=GiftBatchGifts(gifts=gifts).model_dump_json(exclude_none=True),
+    )
+    match response.status_code:
+        case 200:
+            return GiftBatchGiftIds.model_validate_json(response.content)
+        case _:
+            return response
+
+
+@dataclass
+class BatchIngestStats:
+    requests: int = 0
+    accepted: int = 0
+    rejected: int = 0
+    retries: int = 0
+    splits: int = 0
+    skipped: int = 0
+
+
+@dataclass
+class _Chunk:
+    # (index, key, gift) of every gift in one add-gifts request
+    items: list[tuple[int, str, Gift]]
+    attempts: int = 0
+
+
+def _post_chunk(batch_id: str, chunk: _Chunk) -> GiftBatchGiftIds | Response:
+    return gift_batch_gifts_post(batch_id, [gift for _, _, gift in chunk.items])
+
+
+def submit_gifts(
+    batch_id: str,
+    gifts: Iterable[Gift],
+    batch_size: int = MAX_BATCH_SIZE,
+    workers: int = 4,
+    checkpoint: Checkpoint | str | os.PathLike | None = None,
+    key: Callable[[int, Gift], str] | None = None,
+    max_attempts: int = 1,
+    retry_statuses: Iterable[int] = (500, 502, 503, 504),
+    split_statuses: Iterable[int] = (400, 422),
+    stats: BatchIngestStats | None = None,
+) -> Iterator[MutationResult]:
+    """Add a stream of gifts to a gift batch in `batch_size` requests.
+
+    Requests run on `workers` threads and a MutationResult is yielded per
+    gift as its request settles. A request rejected with one of
+    `split_statuses` is split in half and both halves resubmitted, so a
+    bad gift ends up alone in a rejected request of one, with every other
+    gift accepted after about log2(batch_size) extra requests per bad
+    record. `max_attempts` re-sends a request after a `retry_statuses`
+    response or a connection error on top of the client's 429 handling;
+    leave it at 1 unless a duplicate gift is preferable to a missing one.
+
+    With a checkpoint every accepted gift key is logged and skipped on a
+    later run, as in bulk_mutate. `key(index, gift)` defaults to the
+    gift's lookup_id or its position in `gifts`.
+    """
+    owned = checkpoint is not None and not isinstance(checkpoint, Checkpoint)
+    if owned:
+        checkpoint = Checkpoint(checkpoint)
+    key = key or (lambda index, gift: gift.lookup_id or str(index))
+    retry_statuses = frozenset(retry_statuses)
+    split_statuses = frozenset(split_statuses)
+    stats = stats if stats is not None else BatchIngestStats()
+    skipped: list[MutationResult] = []
+
+    def fresh() -> Iterator[tuple[int, str, Gift]]:
+        for index, gift in enumerate(gifts):
+            gift_key = key(index, gift)
+            if checkpoint is not None and gift_key in checkpoint:
+                stats.skipped += 1
+                skipped.append(
+                    MutationResult(
+                        index=index,
+                        key=gift_key,
+                        ok=True,
+                        id=checkpoint.done[gift_key] or None,
+                        skipped=True,
+                    )
+                )
+                continue
+            yield index, gift_key, gift
+
+    source = fresh()
+    window = max(workers, 1) * 2
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending: dict[Future, _Chunk] = {}
+            # split halves and retries go ahead of new gifts
+            ready: list[_Chunk] = []
+
+            def submit(chunk: _Chunk) -> None:
+                chunk.attempts += 1
+                stats.requests += 1
+                pending[pool.submit(_post_chunk, batch_id, chunk)] = chunk
+
+            while True:
+                while len(pending) < window:
+                    if ready:
+                        submit(ready.pop())
+                        continue
+                    items = list(islice(source, batch_size))
+                    if not items:
+                        break
+                    submit(_Chunk(items))
+                yield from skipped
+                skipped.clear()
+                if not pending:
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = pending.pop(future)
+                    try:
+                        outcome = future.result()
+                    except RequestException as e:
+                        outcome = e
+                    yield from _settle(
+                        chunk,
+                        outcome,
+                        ready,
+                        max_attempts,
+                        retry_statuses,
+                        split_statuses,
+                        stats,
+                        checkpoint,
+                    )
+    finally:
+        if owned:
+            checkpoint.close()
+
+
+def _settle(
+    chunk: _Chunk,
+    outcome: GiftBatchGiftIds | Response | RequestException,
+    ready: list[_Chunk],
+    max_attempts: int,
+    retry_statuses: frozenset[int],
+    split_statuses: frozenset[int],
+    stats: BatchIngestStats,
+    checkpoint: Checkpoint | None,
+) -> Iterator[MutationResult]:
+    if isinstance(outcome, GiftBatchGiftIds):
+        ids = outcome.gift_ids
+        for position, (index, gift_key, _) in enumerate(chunk.items):
+            id = ids[position] if position < len(ids) else None
+            if checkpoint is not None:
+                checkpoint.record(gift_key, id)
+            stats.accepted += 1
+            yield MutationResult(
+                index=index, key=gift_key, ok=True, id=id, attempts=chunk.attempts
+            )
+        return
+    response = outcome if isinstance(outcome, Response) else None
+    retryable = response is None or response.status_code in retry_statuses
+    if retryable and chunk.attempts < max_attempts:
+        stats.retries += 1
+        ready.append(chunk)
+        return
+    if response is not None and response.status_code in split_statuses:
+        if len(chunk.items) > 1:
+            stats.splits += 1
+            half = len(chunk.items) // 2
+            # the halves count attempts of their own
+            ready.append(_Chunk(chunk.items[half:]))
+            ready.append(_Chunk(chunk.items[:half]))
+            return
+    for index, gift_key, _ in chunk.items:
+        stats.rejected += 1
+        yield MutationResult(
+            index=index,
+            key=gift_key,
+            ok=False,
+            response=response,
+            error=None if response is not None else outcome,
+            attempts=chunk.attempts,
+        )
@@ -1 +1,320 @@
-# TODO Add Query API
+import csv
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from enum import StrEnum
+from typing import Any, Iterable, Iterator, Type, TypeVar
+
+from pydantic import BaseModel
+from requests import HTTPError, Response
+
+from ..util import HttpMethods, api_request, get_client
+
+M = TypeVar("M", bound=BaseModel)
+
+# characters read from the download per parse step
+CHUNK_SIZE = 1 << 16
+_DELIMITERS = frozenset(",] \t\r\n")
+
+
+class QueryOutputFormat(StrEnum):
+    CSV = "Csv"
+    JSON = "Json"
+    JSONL = "Jsonl"
+
+
+class QueryUxMode(StrEnum):
+    SYNCHRONOUS = "Synchronous"
+    ASYNCHRONOUS = "Asynchronous"
+
+
+class QueryFormattingMode(StrEnum):
+    NONE = "None"
+    UI = "UI"
+
+
+class QuerySqlGenerationMode(StrEnum):
+    QUERY = "Query"
+    EXPORT = "Export"
+    REPORT = "Report"
+
+
+class QueryJobStatus(StrEnum):
+    PENDING = "Pending"
+    RUNNING = "Running"
+    COMPLETED = "Completed"
+    FAILED = "Failed"
+    CANCELED = "Canceled"
+
+
+_FINISHED = {QueryJobStatus.COMPLETED, QueryJobStatus.FAILED, QueryJobStatus.CANCELED}
+
+
+class QueryExecutionRequest(BaseModel):
+    id: int
+    ux_mode: QueryUxMode = QueryUxMode.ASYNCHRONOUS
+    output_format: QueryOutputFormat = QueryOutputFormat.CSV
+    formatting_mode: QueryFormattingMode = QueryFormattingMode.NONE
+    sql_generation_mode: QuerySqlGenerationMode = QuerySqlGenerationMode.QUERY
+    use_static_query_id_set: bool = False
+    results_file_name: str | None = None
+
+
+class QueryJob(BaseModel):
+    id: str
+    status: str | None = None
+    row_count: int | None = None
+    sas_uri: str | None = None
+    status_message: str | None = None
+
+
+class QueryJobError(Exception):
+    """A query job finished without results or did not finish in time."""
+
+    def __init__(self, message: str, job: QueryJob) -> None:
+        super().__init__(message)
+        self.job = job
+
+
+def query_execute_by_id(
+    request: QueryExecutionRequest, product: str = "RE", module: str = "None"
+) -> QueryJob | Response:
+    return api_request(
+        method=HttpMethods.POST,
+        url="https://api.sky.blackbaud.com/query/queries/executebyid",
+        params={"product": product, "module": module},
+        data=request.model_dump_json(exclude_none=True),
+        response_model=QueryJob,
+    )
+
+
+def query_job_get(
+    job_id: str, product: str = "RE", module: str = "None"
+) -> QueryJob | Response:
+    url = f"https://api.sky.blackbaud.com/query/jobs/{job_id}"
+    # job status changes under the same URL, a cached answer would never finish
+    if (cache := get_client().cache) is not None:
+        cache.invalidate(url)
+    return api_request(
+        method=HttpMethods.GET,
+        url=url,
+        params={
+            "product": product,
+            "module": module,
+            "include_read_url": "OnceCompleted",
+        },
+        response_model=QueryJob,
+    )
+
+
+def _checked(result: QueryJob | Response, doing: str) -> QueryJob:
+    if isinstance(result, Response):
+        raise HTTPError(f"{result.status_code} {doing}", response=result)
+    return result
+
+
+def wait_for_job(
+    job_id: str,
+    timeout: float = 3600.0,
+    poll_interval: float = 1.0,
+    max_poll_interval: float = 30.0,
+    backoff: float = 1.5,
+    product: str = "RE",
+    module: str = "None",
+) -> QueryJob:
+    """Poll a job until it completes, backing off from `poll_interval`.
+
+    Raises QueryJobError when the job fails, is canceled or is still
+    running after `timeout` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    delay = poll_interval
+    while True:
+        job = _checked(
+            query_job_get(job_id, product=product, module=module),
+            f"polling query job {job_id}",
+        )
+        if job.status == QueryJobStatus.COMPLETED:
+            return job
+        if job.status in _FINISHED:
+            raise QueryJobError(
+                f"query job {job_id} {job.status}: {job.status_message or ''}", job
+            )
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise QueryJobError(f"query job {job_id} timed out", job)
+        time.sleep(min(delay, remaining))
+        delay = min(delay * backoff, max_poll_interval)
+
+
+def run_query(
+    request: QueryExecutionRequest,
+    timeout: float = 3600.0,
+    product: str = "RE",
+    module: str = "None",
+) -> QueryJob:
+    """Submit a query and wait for its results file."""
+    job = _checked(
+        query_execute_by_id(request, product=product, module=module),
+        f"executing query {request.id}",
+    )
+    if job.status == QueryJobStatus.COMPLETED and job.sas_uri:
+        return job
+    return wait_for_job(job.id, timeout=timeout, product=product, module=module)
+
+
+def run_queries(
+    requests: Iterable[QueryExecutionRequest],
+    workers: int = 4,
+    timeout: float = 3600.0,
+    product: str = "RE",
+    module: str = "None",
+) -> Iterator[tuple[QueryExecutionRequest, QueryJob]]:
+    """Run several queries at once, yielding each with its job as it completes.
+
+    A failing query raises when its turn comes; the others keep running.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(run_query, request, timeout, product, module): request
+            for request in requests
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def _download(job: QueryJob) -> Response:
+    if not job.sas_uri:
+        raise QueryJobError(f"query job {job.id} has no results file", job)
+    # the results URL is pre-signed and must not carry our auth headers
+    response = api_request(
+        method=HttpMethods.GET, url=job.sas_uri, drop_headers=True, stream=True
+    )
+    response.raise_for_status()
+    response.raw.decode_content = True
+    return response
+
+
+def _text(response: Response) -> io.TextIOWrapper:
+    # utf-8-sig drops the byte order mark CSV exports start with
+    return io.TextIOWrapper(response.raw, encoding="utf-8-sig", newline="")
+
+
+def _iter_json_array(text: io.TextIOBase) -> Iterator[Any]:
+    # yield the elements of a top level JSON array one by one, holding at
+    # most one element plus a chunk in memory
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    exhausted = False
+    started = False
+
+    def more() -> bool:
+        nonlocal buffer, position, exhausted
+        chunk = text.read(CHUNK_SIZE)
+        if not chunk:
+            exhausted = True
+            return False
+        buffer = buffer[position:] + chunk
+        position = 0
+        return True
+
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position == len(buffer):
+            if not more():
+                if started:
+                    raise ValueError("query results end inside the JSON array")
+                return
+            continue
+        if not started:
+            if buffer[position] != "[":
+                raise ValueError("query results are not a JSON array")
+            started = True
+            position += 1
+            continue
+        if buffer[position] == "]":
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if not more():
+                raise
+            continue
+        # a number cut at a chunk boundary ("12." or "1e") decodes short, so
+        # only trust a value once a delimiter follows it
+        cut = end == len(buffer) or buffer[end] not in _DELIMITERS
+        if cut and not exhausted and more():
+            continue
+        position = end
+        yield value
+
+
+def iter_rows(
+    job: QueryJob, output_format: QueryOutputFormat | str | None = None
+) -> Iterator[dict[str, Any]]:
+    """Stream a completed job's results as dicts, parsing as they download.
+
+    The format is taken from the results URL unless given. CSV values are
+    strings, as the export writes them.
+    """
+    output_format = output_format or _format_of(job)
+    with _download(job) as response:
+        text = _text(response)
+        match output_format:
+            case QueryOutputFormat.CSV:
+                yield from csv.DictReader(text)
+            case QueryOutputFormat.JSONL:
+                for line in text:
+                    if line.strip():
+                        yield json.loads(line)
+            case QueryOutputFormat.JSON:
+                yield from _iter_json_array(text)
+            case _:
+                raise ValueError(f"unsupported query output format {output_format}")
+
+
+def _format_of(job: QueryJob) -> QueryOutputFormat:
+    path = (job.sas_uri or "").split("?", 1)[0].lower()
+    if path.endswith(".jsonl"):
+        return QueryOutputFormat.JSONL
+    if path.endswith(".json"):
+        return QueryOutputFormat.JSON
+    return QueryOutputFormat.CSV
+
+
+def iter_models(
+    job: QueryJob,
+    model: Type[M],
+    output_format: QueryOutputFormat | str | None = None,
+) -> Iterator[M]:
+    """iter_rows validated into `model`, keyed by the query's column names."""
+    for row in iter_rows(job, output_format):
+        yield model.model_validate(row)
+
+
+def iter_column_batches(
+    rows: Iterable[dict[str, Any]], batch_size: int = 10_000
+) -> Iterator[dict[str, list]]:
+    """Regroup rows into column lists of up to `batch_size` rows each."""
+    columns: dict[str, list] = {}
+    size = 0
+    for row in rows:
+        for name, value in row.items():
+            column = columns.get(name)
+            if column is None:
+                # a column first seen in this batch is None for earlier rows
+                column = columns[name] = [None] * size
+            column.append(value)
+        size += 1
+        for column in columns.values():
+            if len(column) < size:
+                column.append(None)
+        if size == batch_size:
+            yield columns
+            columns = {name: [] for name in columns}
+            size = 0
+    if size:
+        yield columns
@@ -1 +1,448 @@
-# TODO add Webhook API
+import logging
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from enum import StrEnum
+from typing import Any, Callable, Iterable, Iterator
+
+import requests
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from requests import Response
+from werkzeug import Request
+from werkzeug import Response as WsgiResponse
+from werkzeug.serving import WSGIRequestHandler, make_server, run_simple
+
+from ..util import Collection, HttpMethods, api_request, get_client
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookEventType(StrEnum):
+    CONSTITUENT_CHANGE = "com.blackbaud.constituent.change.v1"
+    CONSTITUENT_DELETE = "com.blackbaud.constituent.delete.v1"
+    ADDRESS_CHANGE = "com.blackbaud.constituent.address.change.v1"
+    ADDRESS_DELETE = "com.blackbaud.constituent.address.delete.v1"
+    EMAIL_CHANGE = "com.blackbaud.constituent.emailaddress.change.v1"
+    EMAIL_DELETE = "com.blackbaud.constituent.emailaddress.delete.v1"
+    PHONE_CHANGE = "com.blackbaud.constituent.phone.change.v1"
+    PHONE_DELETE = "com.blackbaud.constituent.phone.delete.v1"
+    NOTE_CHANGE = "com.blackbaud.constituent.note.change.v1"
+    NOTE_DELETE = "com.blackbaud.constituent.note.delete.v1"
+    GIFT_CHANGE = "com.blackbaud.gift.change.v1"
+    GIFT_DELETE = "com.blackbaud.gift.delete.v1"
+
+
+class Subscription(BaseModel):
+    id: str | None = None
+    event_type: str
+    webhook_url: str
+    environment_id: str | None = None
+    application_id: str | None = None
+
+
+class CollectionOfSubscriptions(Collection[Subscription]):
+    # the webhook API returns only the value array
+    count: int = 0
+
+
+class WebhookEvent(BaseModel):
+    # a CloudEvents 1.0 envelope
+    id: str
+    type: str
+    source: str | None = None
+    specversion: str = "1.0"
+    time: datetime | None = None
+    datacontenttype: str | None = None
+    data: dict[str, Any] = {}
+
+
+_events = TypeAdapter(list[WebhookEvent])
+
+
+def subscription_post(subscription: Subscription) -> Subscription | Response:
+    response = api_request(
+        method=HttpMethods.POST,
+        url="https://api.sky.blackbaud.com/webhook/v1/subscriptions",
+        data=subscription.model_dump_json(
+            include={"event_type", "webhook_url"}, exclude_none=True
+        ),
+    )
+    match response.status_code:
+        case 200:
+            subscription.id = response.json()["id"]
+            return subscription
+        case _:
+            return response
+
+
+def subscription_list_get() -> CollectionOfSubscriptions | Response:
+    return api_request(
+        method=HttpMethods.GET,
+        url="https://api.sky.blackbaud.com/webhook/v1/subscriptions",
+        response_model=CollectionOfSubscriptions,
+    )
+
+
+def subscription_get(subscription_id: str) -> Subscription | Response:
+    return api_request(
+        method=HttpMethods.GET,
+        url=f"https://api.sky.blackbaud.com/webhook/v1/subscriptions/{subscription_id}",
+        response_model=Subscription,
+    )
+
+
+def subscription_delete(subscription_id: str) -> Response:
+    return api_request(
+        method=HttpMethods.DELETE,
+        url=f"https://api.sky.blackbaud.com/webhook/v1/subscriptions/{subscription_id}",
+    )
+
+
+def ensure_subscriptions(
+    webhook_url: str, event_types: Iterable[str]
+) -> list[Subscription] | Response:
+    """Subscribe `webhook_url` to each event type it is not subscribed to yet."""
+    existing = subscription_list_get()
+    if isinstance(existing, Response):
+        return existing
+    subscribed = {
+        s.event_type: s for s in existing.iter_all() if s.webhook_url == webhook_url
+    }
+    result = []
+    for event_type in event_types:
+        if event_type not in subscribed:
+            created = subscription_post(
+                Subscription(event_type=event_type, webhook_url=webhook_url)
+            )
+            if isinstance(created, Response):
+                return created
+            subscribed[event_type] = created
+        result.append(subscribed[event_type])
+    return result
+
+
+# record id fields in event data, and the resource each one names
+_RESOURCES = {
+    "constituent_id": "constituent/v1/constituents",
+    "address_id": "constituent/v1/addresses",
+    "email_address_id": "constituent/v1/emailaddresses",
+    "phone_id": "constituent/v1/phones",
+    "note_id": "constituent/v1/notes",
+    "gift_id": "gift/v1/gifts",
+}
+
+
+def invalidation_urls(event: WebhookEvent) -> list[str]:
+    """URLs of the cached resources an event makes stale."""
+    return [
+        f"https://api.sky.blackbaud.com/{resource}/{event.data[key]}"
+        for key, resource in _RESOURCES.items()
+        if event.data.get(key)
+    ]
+
+
+def invalidate_caches(events: list[WebhookEvent]) -> None:
+    """Handler dropping everything the events touched from the client cache."""
+    cache = get_client().cache
+    if cache is None:
+        return
+    # one scan per distinct URL, however many events repeat it
+    for url in dict.fromkeys(
+        url for event in events for url in invalidation_urls(event)
+    ):
+        cache.invalidate(url)
+
+
+Handler = Callable[[list[WebhookEvent]], None]
+
+
+class _QuietHandler(WSGIRequestHandler):
+    # a log line per delivery would cost more than handling it
+    def log_request(self, *args, **kwargs) -> None:
+        pass
+
+
+@dataclass
+class ReceiverStats:
+    received: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    batches: int = 0
+    handled: int = 0
+    handler_errors: int = 0
+
+
+class _Seen:
+    # the most recent `size` event ids, oldest forgotten first
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._ids: OrderedDict[str, None] = OrderedDict()
+
+    def __contains__(self, event_id: str) -> bool:
+        return event_id in self._ids
+
+    def add(self, event_id: str) -> None:
+        self._ids[event_id] = None
+        if len(self._ids) > self.size:
+            self._ids.popitem(last=False)
+
+
+@dataclass
+class _Route:
+    handler: Handler
+    # exact CloudEvents types, None for every event
+    types: frozenset[str] | None = field(default=None)
+
+    def matches(self, event: WebhookEvent) -> bool:
+        return self.types is None or event.type in self.types
+
+
+class WebhookReceiver:
+    """WSGI app receiving SKY webhook deliveries and fanning them out.
+
+    A POST may carry one CloudEvent or a JSON array of them. Events are
+    deduplicated by id over the last `dedupe_window` ids, acknowledged with
+    202 at once and queued; a batcher thread groups them into batches of up
+    to `batch_size` or whatever arrived within `max_delay` seconds, and each
+    handler gets its matching events of a batch as one call on a pool of
+    `workers` threads. Batching waits while every worker is busy; once
+    `max_pending` events are queued a delivery gets a 503 so the sender
+    retries later. Handlers run concurrently, so events of one record
+    can be handled out of order.
+
+    The client response cache is invalidated for every batch unless
+    `invalidate_cache` is False.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        max_delay: float = 0.05,
+        workers: int = 8,
+        dedupe_window: int = 100_000,
+        max_pending: int = 100_000,
+        invalidate_cache: bool = True,
+    ) -> None:
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.stats = ReceiverStats()
+        self._routes: list[_Route] = []
+        self._seen = _Seen(dedupe_window)
+        self._lock = threading.Lock()
+        self._queue: queue.Queue[WebhookEvent | None] = queue.Queue(max_pending)
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        # a batch waits for a free worker, so slow handlers back up into the
+        # bounded queue instead of the pool's unbounded one
+        self._slots = threading.BoundedSemaphore(workers)
+        self._batcher = threading.Thread(target=self._run, daemon=True)
+        self._batcher.start()
+        self._server = None
+        if invalidate_cache:
+            self.add_handler(invalidate_caches)
+
+    def add_handler(
+        self, handler: Handler, event_types: Iterable[str] | None = None
+    ) -> None:
+        types = None if event_types is None else frozenset(event_types)
+        self._routes.append(_Route(handler=handler, types=types))
+
+    def on(self, *event_types: str) -> Callable[[Handler], Handler]:
+        """Decorator form of add_handler, no types means every event."""
+
+        def register(handler: Handler) -> Handler:
+            self.add_handler(handler, event_types or None)
+            return handler
+
+        return register
+
+    def accept(self, events: Iterable[WebhookEvent]) -> bool:
+        """Queue new events, False when the queue is full.
+
+        An id only counts as seen once its event is queued, so events
+        turned away by a full queue are taken when they are redelivered.
+        """
+        with self._lock:
+            for event in events:
+                self.stats.received += 1
+                if event.id in self._seen:
+                    self.stats.duplicates += 1
+                    continue
+                try:
+                    self._queue.put_nowait(event)
+                except queue.Full:
+                    self.stats.rejected += 1
+                    return False
+                self._seen.add(event.id)
+        return True
+
+    @Request.application
+    def __call__(self, request: Request) -> WsgiResponse:
+        if request.method == "OPTIONS":
+            # CloudEvents abuse protection handshake sent on subscribing
+            origin = request.headers.get("WebHook-Request-Origin")
+            headers = {"WebHook-Allowed-Origin": origin} if origin else {}
+            return WsgiResponse(status=200, headers=headers)
+        if request.method != "POST":
+            return WsgiResponse(status=405)
+        body = request.get_data()
+        try:
+            if body.lstrip()[:1] == b"[":
+                events = _events.validate_json(body)
+            else:
+                events = [WebhookEvent.model_validate_json(body)]
+        except ValidationError:
+            return WsgiResponse("invalid event", status=400)
+        if not self.accept(events):
+            return WsgiResponse(status=503, headers={"Retry-After": "1"})
+        return WsgiResponse(status=202)
+
+    def _run(self) -> None:
+        while True:
+            event = self._queue.get()
+            if event is None:
+                return
+            batch = [event]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.batch_size:
+                try:
+                    event = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if event is None:
+                    self._dispatch(batch)
+                    return
+                batch.append(event)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: list[WebhookEvent]) -> None:
+        with self._lock:
+            self.stats.batches += 1
+        for route in self._routes:
+            matched = [event for event in batch if route.matches(event)]
+            if matched:
+                self._slots.acquire()
+                future = self._pool.submit(self._handle, route.handler, matched)
+                future.add_done_callback(lambda _: self._slots.release())
+
+    def _handle(self, handler: Handler, events: list[WebhookEvent]) -> None:
+        try:
+            handler(events)
+        except Exception:
+            logger.exception("webhook handler %r failed", handler)
+            with self._lock:
+                self.stats.handler_errors += 1
+        else:
+            with self._lock:
+                self.stats.handled += len(events)
+
+    def serve(self, host: str = "0.0.0.0", port: int = 8000) -> None:
+        """Serve in the foreground with werkzeug's threaded server."""
+        run_simple(hostname=host, port=port, application=self, threaded=True)
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve on a background thread and return the receiver's URL."""
+        self._server = make_server(
+            host, port, self, threaded=True, request_handler=_QuietHandler
+        )
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self._server.server_port}"
+
+    def close(self) -> None:
+        """Stop serving, hand out what is queued and wait for the handlers."""
+        if self._server is not None:
+            self._server.shutdown()
+        self._queue.put(None)
+        self._batcher.join()
+        self._pool.shutdown(wait=True)
+
+
+def generate_events(
+    count: int,
+    event_types: Iterable[str] = (
+        WebhookEventType.CONSTITUENT_CHANGE,
+        WebhookEventType.ADDRESS_CHANGE,
+        WebhookEventType.EMAIL_CHANGE,
+    ),
+    constituents: int = 1000,
+    duplicate_rate: float = 0.0,
+    seed: int | None = None,
+) -> Iterator[WebhookEvent]:
+    """Fake SKY change events for exercising a receiver locally.
+
+    `duplicate_rate` of them repeat an earlier event id, the way redelivered
+    events do.
+    """
+    rng = random.Random(seed)
+    types = list(event_types)
+    sent: list[WebhookEvent] = []
+    for _ in range(count):
+        if sent and rng.random() < duplicate_rate:
+            yield rng.choice(sent)
+            continue
+        event_type = rng.choice(types)
+        constituent_id = str(rng.randrange(constituents))
+        data: dict[str, Any] = {"constituent_id": constituent_id}
+        for key, kind in (
+            ("address_id", ".address."),
+            ("email_address_id", ".emailaddress."),
+            ("phone_id", ".phone."),
+            ("note_id", ".note."),
+        ):
+            if kind in event_type:
+                data[key] = str(rng.randrange(constituents * 3))
+        event = WebhookEvent(
+            id=str(uuid.UUID(int=rng.getrandbits(128))),
+            type=event_type,
+            source="local",
+            time=datetime.now(UTC),
+            datacontenttype="application/json",
+            data=data,
+        )
+        if len(sent) < 10_000:
+            sent.append(event)
+        yield event
+
+
+def send_events(
+    url: str,
+    events: Iterable[WebhookEvent],
+    batch_size: int = 100,
+    workers: int = 4,
+) -> int:
+    """POST events to a receiver as CloudEvents batches; returns events sent."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    def post(batch: list[WebhookEvent]) -> int:
+        body = _events.dump_json(batch)
+        while True:
+            response = session.post(
+                url,
+                data=body,
+                headers={"Content-Type": "application/cloudevents-batch+json"},
+            )
+            if response.status_code != 503:
+                response.raise_for_status()
+                return len(batch)
+            time.sleep(float(response.headers.get("Retry-After", 1)))
+
+    def batches() -> Iterator[list[WebhookEvent]]:
+        batch = []
+        for event in events:
+            batch.append(event)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    with session, ThreadPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(post, batches()))
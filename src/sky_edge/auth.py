@@ -1,23 +1,31 @@
 import multiprocessing
+import threading
 import time
 import urllib.parse
 import webbrowser
 from base64 import b64encode
-from dataclasses import dataclass
+from contextlib import nullcontext
+from dataclasses import dataclass, field
 from os import getenv
 
 import requests
 from dotenv import load_dotenv
 from werkzeug import Request, Response, run_simple
 
+from .metrics import TOKEN, span
+from .token_store import FileTokenStore, TokenStore
+
 load_dotenv()
 
 PORT = 13631
+TOKEN_URL = "https://oauth2.sky.blackbaud.com/token"
 REDIRECT_URI = f"http://localhost:{PORT}/callback"
 
 CLIENT_ID = getenv(key="CLIENT_ID")
 APPLICATION_SECRET = getenv(key="APPLICATION_SECRET")
 BB_API_SUBSCRIPTION_KEY = getenv(key="BB_API_SUBSCRIPTION_KEY")
+# path of the on-disk token cache, set to an empty string to disable it
+SKY_EDGE_TOKEN_CACHE = getenv(key="SKY_EDGE_TOKEN_CACHE")
 
 
 @dataclass
@@ -36,7 +44,8 @@ class AppTokens:
     given_name: str
     refresh_token_expires_in: int
     mode: str
-    granted_at: float = time.time()
+    # default_factory so each grant is stamped when it is created, not at import
+    granted_at: float = field(default_factory=time.time)
 
     def access_expired(self) -> bool:
         return self.expires_in + self.granted_at < time.time()
@@ -44,9 +53,8 @@ class AppTokens:
     def refresh_expired(self) -> bool:
         return self.refresh_token_expires_in + self.granted_at < time.time()
 
-
-_auth_token: AppTokens | None = None
-_initialized = False
+    def refresh_due_in(self, margin: float) -> float:
+        return self.granted_at + self.expires_in - margin - time.time()
 
 
 def get_token(q: multiprocessing.Queue) -> None:
@@ -81,9 +89,7 @@ def request_authorization() -> str:
     return token
 
 
-def request_token(input: str | AppTokens) -> None:
-    global _auth_token
-    TOKEN_URL = "https://oauth2.sky.blackbaud.com/token"
+def request_token(input: str | AppTokens) -> AppTokens:
     body = {}
     headers = {}
     match input:
@@ -107,23 +113,140 @@ def request_token(input: str | AppTokens) -> None:
                 "authorization": forge_authorization(),
                 "Content-Type": "application/x-www-form-urlencoded",
             }
-    response = requests.post(url=TOKEN_URL, data=body, headers=headers).json()
-    _auth_token = AppTokens(**response)
+    with span(TOKEN, url=TOKEN_URL, grant_type=body["grant_type"]):
+        response = requests.post(url=TOKEN_URL, data=body, headers=headers).json()
+    return AppTokens(**response)
+
+
+class TokenManager:
+    """Holds the current AppTokens and refreshes them single-flight.
+
+    Readers take the lock-free fast path while the token is valid. When it
+    has expired exactly one thread talks to the OAuth endpoint and the rest
+    wait on the lock and reuse its result. After every grant a daemon timer
+    refreshes `refresh_margin` seconds before expiry, so request threads
+    normally never see an expired token at all.
+
+    With a `store` the first get() starts from the persisted tokens, and
+    every renewal happens under the store's lock after re-reading it, so
+    concurrent processes reuse one refresh instead of racing each other.
+    """
+
+    def __init__(
+        self, refresh_margin: float = 300.0, store: TokenStore | None = None
+    ) -> None:
+        self.refresh_margin = refresh_margin
+        self.store = store
+        self._token: AppTokens | None = None
+        self._bearer: str | None = None
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+
+    def current(self) -> AppTokens | None:
+        token = self._token
+        if token is not None and not token.access_expired():
+            return token
+        return None
+
+    def get(self) -> AppTokens:
+        if token := self.current():
+            return token
+        with self._lock:
+            if token := self.current():
+                return token
+            return self._renew()
+
+    def bearer(self) -> str:
+        # built once per grant rather than on every request
+        if self.current() is None:
+            self.get()
+        if self._bearer is None:
+            raise ValueError(f"Auth Token Process Failure {self._token}")
+        return self._bearer
+
+    def _store_lock(self):
+        return self.store.locked() if self.store is not None else nullcontext()
+
+    def _newer_stored(self) -> AppTokens | None:
+        if self.store is None:
+            return None
+        stored = self.store.load()
+        if stored is None:
+            return None
+        if self._token is None or stored.granted_at > self._token.granted_at:
+            return stored
+        return None
+
+    def _renew(self) -> AppTokens:
+        # caller holds self._lock
+        with self._store_lock():
+            token = self._newer_stored() or self._token
+            if token is not None and not token.access_expired():
+                self._set(token, persist=False)
+                return token
+            if token is None or token.refresh_expired():
+                token = request_token(input=request_authorization())
+            else:
+                token = request_token(input=token)
+            self._set(token)
+            return token
+
+    def _set(self, token: AppTokens, persist: bool = True) -> None:
+        self._bearer = f"Bearer {token.access_token}"
+        self._token = token
+        if persist and self.store is not None:
+            self.store.save(token)
+        self._schedule(token)
+
+    def _schedule(self, token: AppTokens) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(
+            max(token.refresh_due_in(self.refresh_margin), 0.0),
+            self._background_refresh,
+            args=(token,),
+        )
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self, token: AppTokens) -> None:
+        with self._lock, self._store_lock():
+            if self._token is not token or token.refresh_expired():
+                return
+            if stored := self._newer_stored():
+                # another process already refreshed
+                self._set(stored, persist=False)
+                return
+            try:
+                self._set(request_token(input=token))
+            except (requests.RequestException, TypeError, ValueError):
+                # leave it to the next get() once the token actually expires
+                pass
+
+    def stop(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+def default_token_store() -> TokenStore | None:
+    if SKY_EDGE_TOKEN_CACHE == "":
+        return None
+    return FileTokenStore(path=SKY_EDGE_TOKEN_CACHE)
+
+
+_token_manager = TokenManager(store=default_token_store())
+
+
+def get_token_manager() -> TokenManager:
+    return _token_manager
+
+
+def set_token_manager(manager: TokenManager) -> None:
+    global _token_manager
+    _token_manager.stop()
+    _token_manager = manager
 
 
 def get_auth_token() -> AppTokens:
-    global _auth_token, _initialized
-
-    if not _initialized:
-        request_token(input=request_authorization())
-        _initialized = True
-        if _auth_token:
-            return _auth_token
-        raise ValueError(f"Auth Token Process Failure {_auth_token}")
-    else:
-        if isinstance(_auth_token, AppTokens):
-            if _auth_token.access_expired():
-                request_token(_auth_token)
-            if _auth_token:
-                return _auth_token
-        raise ValueError(f"Auth Token Process Failure {_auth_token}")
+    return _token_manager.get()
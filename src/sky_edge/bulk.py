@@ -0,0 +1,248 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, TypeVar
+
+from pydantic import BaseModel
+from requests import HTTPError, RequestException, Response
+
+from .util import Collection, T
+
+M = TypeVar("M", bound=BaseModel)
+
+# SKY API caps list endpoints at 5000 records per page
+MAX_PAGE_SIZE = 5000
+
+OffsetFetcher = Callable[[int, int], Collection[T] | Response]
+
+
+def _checked(page: Collection[T] | Response, offset: int) -> Collection[T]:
+    if isinstance(page, Response):
+        raise HTTPError(
+            f"{page.status_code} fetching shard at offset {offset}", response=page
+        )
+    return page
+
+
+def bulk_list_pages(
+    fetch: OffsetFetcher,
+    page_size: int = MAX_PAGE_SIZE,
+    workers: int = 8,
+    ordered: bool = True,
+    start: int = 0,
+) -> Iterator[Collection[T]]:
+    """Fetch a whole list endpoint as offset shards on a thread pool.
+
+    `fetch(offset, limit)` requests one page. The first page is fetched
+    alone to learn `count`; the remaining range is split into `page_size`
+    shards with at most `workers * 2` in flight, so memory is bounded by
+    the window rather than the collection. With ordered=False pages are
+    yielded as they complete.
+    """
+    first = _checked(fetch(start, page_size), start)
+    yield first
+
+    offsets = iter(range(start + page_size, first.count, page_size))
+    window = max(workers, 1) * 2
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending: deque[tuple[int, Future]] = deque()
+
+        def fill() -> None:
+            while len(pending) < window:
+                offset = next(offsets, None)
+                if offset is None:
+                    return
+                pending.append((offset, pool.submit(fetch, offset, page_size)))
+
+        try:
+            fill()
+            while pending:
+                if ordered:
+                    offset, future = pending.popleft()
+                else:
+                    wait([f for _, f in pending], return_when=FIRST_COMPLETED)
+                    offset, future = next((o, f) for o, f in pending if f.done())
+                    pending.remove((offset, future))
+                page = _checked(future.result(), offset)
+                fill()
+                yield page
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def bulk_list(
+    fetch: OffsetFetcher,
+    page_size: int = MAX_PAGE_SIZE,
+    workers: int = 8,
+    ordered: bool = True,
+    start: int = 0,
+) -> Iterator[T]:
+    """Yield every item of a list endpoint, see bulk_list_pages."""
+    for page in bulk_list_pages(
+        fetch=fetch,
+        page_size=page_size,
+        workers=workers,
+        ordered=ordered,
+        start=start,
+    ):
+        yield from page.value
+
+
+@dataclass
+class MutationResult:
+    index: int
+    key: str
+    ok: bool
+    id: str | None = None
+    response: Response | None = None
+    error: BaseException | None = None
+    attempts: int = 0
+    # already completed by an earlier run according to the checkpoint
+    skipped: bool = False
+
+
+class Checkpoint:
+    """Append-only log of completed item keys, one `key<TAB>id` per line.
+
+    Lines are flushed and fsynced as they are written, so after a crash a
+    new run with the same file skips everything that already went through.
+    """
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        self.path = path
+        self.done: dict[str, str] = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                for line in f:
+                    key, _, id = line.rstrip("\n").partition("\t")
+                    if key:
+                        self.done[key] = id
+        except FileNotFoundError:
+            pass
+        self._file = open(path, "a")
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.done
+
+    def record(self, key: str, id: str | None) -> None:
+        with self._lock:
+            self.done[key] = id or ""
+            self._file.write(f"{key}\t{id or ''}\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _mutate_one(
+    index: int,
+    key: str,
+    item: M,
+    operation: Callable[[M], BaseModel | Response],
+    max_attempts: int,
+    retry_statuses: frozenset[int],
+) -> MutationResult:
+    result = MutationResult(index=index, key=key, ok=False)
+    while result.attempts < max_attempts:
+        result.attempts += 1
+        try:
+            outcome = operation(item)
+        except RequestException as e:
+            result.error = e
+            continue
+        except Exception as e:  # noqa: BLE001
+            # validation and write-check errors will not pass on a retry,
+            # and must not take the rest of the run down with them
+            result.error = e
+            return result
+        result.error = None
+        if isinstance(outcome, Response):
+            result.response = outcome
+            if outcome.ok:
+                result.ok = True
+                return result
+            if outcome.status_code not in retry_statuses:
+                return result
+            continue
+        result.ok = True
+        result.response = None
+        result.id = getattr(outcome, "id", None)
+        return result
+    return result
+
+
+def bulk_mutate(
+    items: Iterable[M],
+    operation: Callable[[M], BaseModel | Response],
+    workers: int = 8,
+    checkpoint: Checkpoint | str | os.PathLike | None = None,
+    key: Callable[[int, M], str] | None = None,
+    max_attempts: int = 1,
+    retry_statuses: Iterable[int] = (429, 500, 502, 503, 504),
+) -> Iterator[MutationResult]:
+    """Run a write endpoint (address_patch, alias_patch, ...) over many models.
+
+    Items go through a pool of `workers` threads; requests still pass the
+    client's shared rate limiter and retry policy. Results are yielded as
+    they complete. `max_attempts` re-sends items that fail with a
+    `retry_statuses` response or a connection error on top of that policy,
+    so leave it at 1 for non-idempotent operations such as posts. Any other
+    exception fails just its item, with the exception in `error`.
+
+    With a checkpoint every successful key is logged, and keys already in
+    the log are yielded as skipped without being sent. `key(index, item)`
+    defaults to the item's id or, for new records, its position in `items`.
+    """
+    owned = checkpoint is not None and not isinstance(checkpoint, Checkpoint)
+    if owned:
+        checkpoint = Checkpoint(checkpoint)
+    key = key or (lambda index, item: getattr(item, "id", None) or str(index))
+    retry_statuses = frozenset(retry_statuses)
+    source = iter(enumerate(items))
+    window = max(workers, 1) * 2
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending: set[Future] = set()
+            while True:
+                while len(pending) < window:
+                    next_item = next(source, None)
+                    if next_item is None:
+                        break
+                    index, item = next_item
+                    item_key = key(index, item)
+                    if checkpoint is not None and item_key in checkpoint:
+                        yield MutationResult(
+                            index=index,
+                            key=item_key,
+                            ok=True,
+                            id=checkpoint.done[item_key] or None,
+                            skipped=True,
+                        )
+                        continue
+                    pending.add(
+                        pool.submit(
+                            _mutate_one,
+                            index,
+                            item_key,
+                            item,
+                            operation,
+                            max_attempts,
+                            retry_statuses,
+                        )
+                    )
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if result.ok and checkpoint is not None:
+                        checkpoint.record(result.key, result.id)
+                    yield result
+    finally:
+        if owned:
+            checkpoint.close()
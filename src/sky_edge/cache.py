@@ -0,0 +1,348 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from typing import Callable
+from urllib.parse import urlencode, urlsplit
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+# response headers worth replaying from the cache
+_KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control")
+
+
+def cache_key(url: str, params: dict | None = None) -> str:
+    if not params:
+        return url
+    query = urlencode(sorted(params.items()), doseq=True)
+    return f"{url}{'&' if '?' in url else '?'}{query}"
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    status_code: int
+    headers: dict[str, str]
+    content: bytes
+    expires_at: float
+    stored_at: float = field(default_factory=time.time)
+
+    @property
+    def etag(self) -> str | None:
+        return self.headers.get("ETag")
+
+    @property
+    def last_modified(self) -> str | None:
+        return self.headers.get("Last-Modified")
+
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        elif not self.etag:
+            headers["If-Modified-Since"] = formatdate(self.stored_at, usegmt=True)
+        return headers
+
+    def to_response(self) -> Response:
+        response = Response()
+        response.status_code = self.status_code
+        response._content = self.content
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.url = self.url
+        response.encoding = "utf-8"
+        response.from_cache = True
+        return response
+
+
+def _max_age(headers) -> float | None:
+    for directive in headers.get("Cache-Control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name == "max-age" and value.isdigit():
+            return float(value)
+    return None
+
+
+def _no_store(headers) -> bool:
+    return "no-store" in headers.get("Cache-Control", "")
+
+
+# trailing segments that make a collection URL a query rather than a record
+_QUERY_SEGMENTS = frozenset({"search"})
+
+
+def _segments(url: str) -> tuple[str, list[str]]:
+    parts = urlsplit(url)
+    return parts.netloc, [s for s in parts.path.split("/") if s]
+
+
+def _collection(segments: list[str]) -> str | None:
+    # /<api>/<version>/<collection>/<id>/<collection>/<id>...
+    if len(segments) < 3:
+        return None
+    return segments[2 + (len(segments) - 3) // 2 * 2]
+
+
+def _resource_tag(netloc: str, segments: list[str]) -> str:
+    return f"{netloc}/{'/'.join(segments)}"
+
+
+def _list_tag(netloc: str, segments: list[str], collection: str) -> str:
+    return f"{netloc}/{'/'.join(segments[:2])} {collection}"
+
+
+def _tags(key: str) -> list[str]:
+    # a key is found by its own path, every record path above it and, for
+    # list and query URLs, the API and collection it lists
+    netloc, segments = _segments(key)
+    tags = [_resource_tag(netloc, segments[:i]) for i in range(3, len(segments) + 1)]
+    listing = (len(segments) - 3) % 2 == 0 or segments[-1] in _QUERY_SEGMENTS
+    if (collection := _collection(segments)) is not None and listing:
+        tags.append(_list_tag(netloc, segments, collection))
+    return tags
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    revalidated: int = 0
+    stored: int = 0
+    evicted: int = 0
+    invalidated: int = 0
+
+
+class DiskCache:
+    """SQLite second tier so warm entries outlive the process."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, url TEXT, status_code INTEGER, headers TEXT,"
+            " content BLOB, expires_at REAL, stored_at REAL)"
+        )
+        self._db.commit()
+
+    def get(self, key: str) -> CacheEntry | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, status_code, headers, content, expires_at, stored_at"
+                " FROM entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        url, status_code, headers, content, expires_at, stored_at = row
+        return CacheEntry(
+            url=url,
+            status_code=status_code,
+            headers=json.loads(headers),
+            content=content,
+            expires_at=expires_at,
+            stored_at=stored_at,
+        )
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    entry.url,
+                    entry.status_code,
+                    json.dumps(entry.headers),
+                    entry.content,
+                    entry.expires_at,
+                    entry.stored_at,
+                ),
+            )
+            self._db.commit()
+
+    def delete(self, keys: list[str]) -> None:
+        with self._lock:
+            self._db.executemany(
+                "DELETE FROM entries WHERE key = ?", [(k,) for k in keys]
+            )
+            self._db.commit()
+
+    def keys(self) -> list[str]:
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT key FROM entries")]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class ResponseCache:
+    """LRU/TTL cache of GET responses with conditional revalidation.
+
+    Fresh entries are served without touching the network. Stale entries
+    are revalidated with If-None-Match/If-Modified-Since and a 304 renews
+    them. Memory is bounded by both `max_entries` and `max_bytes`; pass
+    `disk_path` to keep a SQLite tier behind the in-memory one.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        max_entries: int = 2048,
+        max_bytes: int = 64 * 1024 * 1024,
+        disk_path: str | None = None,
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self.disk = DiskCache(disk_path) if disk_path else None
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        # tag -> keys held in either tier, see _tags
+        self._index: dict[str, set[str]] = {}
+        if self.disk is not None:
+            for key in self.disk.keys():
+                self._index_key(key)
+
+    def _index_key(self, key: str) -> None:
+        for tag in _tags(key):
+            self._index.setdefault(tag, set()).add(key)
+
+    def _unindex_key(self, key: str) -> None:
+        for tag in _tags(key):
+            if (keys := self._index.get(tag)) is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[tag]
+
+    def get(self, key: str) -> CacheEntry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if self.disk is not None and (entry := self.disk.get(key)) is not None:
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        # disk first, so an invalidation never misses a row that is indexed
+        if self.disk is not None:
+            self.disk.put(key, entry)
+        self._remember(key, entry)
+
+    def _remember(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            if (old := self._entries.pop(key, None)) is not None:
+                self._size -= len(old.content)
+            self._index_key(key)
+            if len(entry.content) > self.max_bytes:
+                if self.disk is None:
+                    self._unindex_key(key)
+                return
+            self._entries[key] = entry
+            self._size += len(entry.content)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.content)
+                self.stats.evicted += 1
+                # still on disk when there is one
+                if self.disk is None:
+                    self._unindex_key(evicted_key)
+
+    def _store(self, key: str, response: Response) -> None:
+        if _no_store(response.headers):
+            return
+        ttl = _max_age(response.headers)
+        self.put(
+            key,
+            CacheEntry(
+                url=response.url or key,
+                status_code=response.status_code,
+                headers={
+                    h: response.headers[h]
+                    for h in _KEPT_HEADERS
+                    if h in response.headers
+                },
+                content=response.content,
+                expires_at=time.time() + (self.ttl if ttl is None else ttl),
+            ),
+        )
+        with self._lock:
+            self.stats.stored += 1
+
+    def fetch(
+        self,
+        url: str,
+        params: dict | None,
+        headers: dict[str, str],
+        send: Callable[[dict[str, str]], Response],
+    ) -> Response:
+        key = cache_key(url, params)
+        entry = self.get(key)
+        if entry is not None and entry.fresh():
+            with self._lock:
+                self.stats.hits += 1
+            return entry.to_response()
+        with self._lock:
+            self.stats.misses += 1
+        if entry is not None:
+            headers = {**headers, **entry.conditional_headers()}
+        response = send(headers)
+        if response.status_code == 304 and entry is not None:
+            with self._lock:
+                self.stats.revalidated += 1
+            ttl = _max_age(response.headers)
+            entry.expires_at = time.time() + (self.ttl if ttl is None else ttl)
+            entry.stored_at = time.time()
+            for h in _KEPT_HEADERS:
+                if h in response.headers:
+                    entry.headers[h] = response.headers[h]
+            self.put(key, entry)
+            return entry.to_response()
+        if response.status_code == 200:
+            self._store(key, response)
+        return response
+
+    def invalidate(self, url: str) -> int:
+        """Drop entries a write to `url` could have made stale.
+
+        That is the resource itself, anything below it and the list and
+        query URLs of its collection in the same API, e.g. a PATCH to
+        /constituent/v1/addresses/{id} also drops
+        /constituent/v1/constituents/{id}/addresses but no other address or
+        constituent. Keys are looked up in an index, not scanned.
+        """
+        netloc, segments = _segments(url)
+        tags = [_resource_tag(netloc, segments)]
+        if (collection := _collection(segments)) is not None:
+            tags.append(_list_tag(netloc, segments, collection))
+        with self._lock:
+            keys = set().union(*(self._index.get(tag, ()) for tag in tags))
+            for key in keys:
+                self._unindex_key(key)
+                if (entry := self._entries.pop(key, None)) is not None:
+                    self._size -= len(entry.content)
+            self.stats.invalidated += len(keys)
+        if self.disk is not None and keys:
+            self.disk.delete(list(keys))
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+            self._size = 0
+        if self.disk is not None:
+            self.disk.delete(self.disk.keys())
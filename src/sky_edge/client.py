@@ -0,0 +1,92 @@
+from dataclasses import dataclass, field
+from typing import Callable
+
+from pydantic import BaseModel
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
+
+from .cache import ResponseCache
+from .coalesce import SingleFlight
+from .decode import DecodeStats
+from .ratelimit import RateLimiter, RetryPolicy
+
+
+@dataclass
+class ClientConfig:
+    # number of per-host pools kept around, we mostly talk to one host
+    pool_connections: int = 4
+    # connections kept warm per host, size this to the largest worker pool
+    pool_maxsize: int = 32
+    # wait for a free pooled connection instead of opening a throwaway one
+    pool_block: bool = True
+    keep_alive: bool = True
+    # None waits forever, as requests does by default
+    connect_timeout: float | None = None
+    read_timeout: float | None = None
+
+
+def enable_http2() -> None:
+    """Switch every HTTPS connection urllib3 opens in this process to HTTP/2.
+
+    urllib3 only offers HTTP/2 process-wide, so this affects any library in
+    the process using urllib3, not just sky-edge clients, and cannot be
+    limited to one Client. Needs urllib3>=2.3 with h2, see the [http2] extra.
+    """
+    try:
+        from urllib3.http2 import inject_into_urllib3
+
+        # checks the installed h2 version
+        inject_into_urllib3()
+    except ImportError as e:
+        raise ImportError(
+            "HTTP/2 requires urllib3>=2.3 and h2,"
+            " install with `pip install sky-edge[http2]`"
+        ) from e
+
+
+@dataclass
+class Client:
+    """Owns the pooled Session plus the throttling state used by util.
+
+    A single Client is safe to share between threads: requests' adapters
+    hand out connections from a thread-safe urllib3 pool, so parallel
+    callers reuse warm TLS connections instead of opening new ones.
+    """
+
+    config: ClientConfig = field(default_factory=ClientConfig)
+    rate_limiter: RateLimiter = field(default_factory=RateLimiter)
+    retry_policy: RetryPolicy = field(default_factory=RetryPolicy)
+    # GET responses are only cached when a ResponseCache is attached
+    cache: ResponseCache | None = None
+    # identical concurrent GETs share one request when this is set
+    single_flight: SingleFlight | None = None
+    decode_stats: DecodeStats = field(default_factory=DecodeStats)
+    # run on each model a write helper is about to send, raising stops it
+    check_write: Callable[[BaseModel], object] | None = None
+
+    def __post_init__(self) -> None:
+        self.session = Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.config.pool_connections,
+            pool_maxsize=self.config.pool_maxsize,
+            pool_block=self.config.pool_block,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if not self.config.keep_alive:
+            self.session.headers["Connection"] = "close"
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        kwargs.setdefault(
+            "timeout", (self.config.connect_timeout, self.config.read_timeout)
+        )
+        return self.session.request(method=method, url=url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
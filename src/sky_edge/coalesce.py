@@ -0,0 +1,58 @@
+import threading
+from dataclasses import dataclass
+from typing import Callable, Hashable, TypeVar
+
+R = TypeVar("R")
+
+
+@dataclass
+class CoalesceStats:
+    leaders: int = 0
+    followers: int = 0
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight block and receive the very same result object (or the same
+    exception). Nothing is remembered once the call finishes, so this is
+    deduplication of bursts rather than a cache.
+    """
+
+    def __init__(self) -> None:
+        self.stats = CoalesceStats()
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], R]) -> R:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats.leaders += 1
+            else:
+                self.stats.followers += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
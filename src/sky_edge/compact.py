@@ -0,0 +1,246 @@
+import sys
+import types
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Sequence,
+    Union,
+    get_args,
+    get_origin,
+)
+
+from pydantic import BaseModel, TypeAdapter
+
+
+def _model_in(annotation) -> type[BaseModel] | None:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    if get_origin(annotation) in (Union, types.UnionType):
+        models = [m for a in get_args(annotation) if (m := _model_in(a))]
+        return models[0] if len(models) == 1 else None
+    return None
+
+
+def _list_model_in(annotation) -> type[BaseModel] | None:
+    if get_origin(annotation) in (Union, types.UnionType):
+        found = [m for a in get_args(annotation) if (m := _list_model_in(a))]
+        return found[0] if len(found) == 1 else None
+    if get_origin(annotation) is list:
+        (item,) = get_args(annotation) or (None,)
+        return _model_in(item)
+    return None
+
+
+class _Layout:
+    """Column order and per-field decoders for one model, shared by all rows."""
+
+    def __init__(self, model: type[BaseModel], fields: Sequence[str]) -> None:
+        self.model = model
+        self.fields = tuple(fields)
+        self.index = {name: i for i, name in enumerate(self.fields)}
+        # nested model fields are packed as rows too, with their own layout
+        self.nested: dict[int, tuple[_Layout, bool]] = {}
+        self._adapters: dict[str, TypeAdapter] = {}
+
+    def _bind(self) -> None:
+        # after registration, so self-referencing models find this layout
+        for i, name in enumerate(self.fields):
+            annotation = self.model.model_fields[name].annotation
+            if nested := _model_in(annotation):
+                self.nested[i] = (layout(nested), False)
+            elif nested := _list_model_in(annotation):
+                self.nested[i] = (layout(nested), True)
+
+    def pack(self, data: dict) -> tuple:
+        row = [data.get(name) for name in self.fields]
+        for i, (inner, many) in self.nested.items():
+            value = row[i]
+            if many and isinstance(value, list):
+                row[i] = tuple(
+                    inner.pack(v) if isinstance(v, dict) else v for v in value
+                )
+            elif not many and isinstance(value, dict):
+                row[i] = inner.pack(value)
+        for i, value in enumerate(row):
+            if type(value) is str and len(value) <= 32:
+                # codes, types and countries repeat across thousands of rows
+                row[i] = sys.intern(value)
+        # trailing empty fields are not stored at all
+        while row and row[-1] is None:
+            row.pop()
+        return tuple(row)
+
+    def raw(self, row: tuple, i: int) -> Any:
+        value = row[i] if i < len(row) else None
+        if value is None or i not in self.nested:
+            return value
+        inner, many = self.nested[i]
+        if many:
+            return [inner.unpack(v) if isinstance(v, tuple) else v for v in value]
+        return inner.unpack(value)
+
+    def unpack(self, row: tuple) -> dict:
+        return {
+            name: value
+            for i, name in enumerate(self.fields)
+            if (value := self.raw(row, i)) is not None
+        }
+
+    def decoded(self, row: tuple, name: str) -> Any:
+        value = self.raw(row, self.index[name])
+        if value is None:
+            return None
+        adapter = self._adapters.get(name)
+        if adapter is None:
+            adapter = TypeAdapter(self.model.model_fields[name].annotation)
+            self._adapters[name] = adapter
+        return adapter.validate_python(value)
+
+
+_layouts: dict[tuple[type[BaseModel], tuple[str, ...] | None], _Layout] = {}
+
+
+def layout(model: type[BaseModel], fields: Iterable[str] | None = None) -> _Layout:
+    key = (model, None if fields is None else tuple(fields))
+    found = _layouts.get(key)
+    if found is None:
+        found = _layouts[key] = _Layout(
+            model, model.model_fields if fields is None else key[1]
+        )
+        found._bind()
+    return found
+
+
+class CompactRecord:
+    """One row of a CompactRecords page.
+
+    Attribute access decodes just that field through pydantic (so a
+    date_modified comes back as a datetime) without caching it, and
+    to_model() builds the full validated model when one is really needed.
+    """
+
+    __slots__ = ("_layout", "_row")
+
+    def __init__(self, layout: _Layout, row: tuple) -> None:
+        self._layout = layout
+        self._row = row
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self._layout.decoded(self._row, name)
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def raw(self, name: str) -> Any:
+        """The field as it came out of the JSON, without decoding."""
+        return self._layout.raw(self._row, self._layout.index[name])
+
+    def to_dict(self) -> dict:
+        return self._layout.unpack(self._row)
+
+    def to_model(self) -> BaseModel:
+        return self._layout.model.model_validate(self.to_dict())
+
+    def __repr__(self) -> str:
+        return f"Compact{self._layout.model.__name__}({self.to_dict()!r})"
+
+
+class CompactRecords(Sequence[CompactRecord]):
+    """A page of records held as interned tuples instead of pydantic models.
+
+    Each record costs one tuple sized to its last non-empty field; field
+    names, nested layouts and decoders are shared per model. Indexing and
+    iteration yield CompactRecord views.
+    """
+
+    __slots__ = ("_layout", "_rows")
+
+    def __init__(self, layout: _Layout, rows: list[tuple]) -> None:
+        self._layout = layout
+        self._rows = rows
+
+    @classmethod
+    def from_json(
+        cls,
+        model: type[BaseModel],
+        records: Iterable[dict],
+        fields: Iterable[str] | None = None,
+    ) -> "CompactRecords":
+        shape = layout(model, fields)
+        return cls(shape, [shape.pack(r) for r in records])
+
+    @classmethod
+    def from_models(
+        cls, records: Iterable[BaseModel], fields: Iterable[str] | None = None
+    ) -> "CompactRecords":
+        records = list(records)
+        if not records:
+            raise ValueError("from_models needs at least one record")
+        return cls.from_json(
+            type(records[0]),
+            (r.model_dump(mode="json", exclude_none=True) for r in records),
+            fields,
+        )
+
+    @property
+    def model(self) -> type[BaseModel]:
+        return self._layout.model
+
+    @property
+    def fields(self) -> tuple[str, ...]:
+        return self._layout.fields
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return CompactRecords(self._layout, self._rows[i])
+        return CompactRecord(self._layout, self._rows[i])
+
+    def __iter__(self) -> Iterator[CompactRecord]:
+        shape = self._layout
+        for row in self._rows:
+            yield CompactRecord(shape, row)
+
+    def __repr__(self) -> str:
+        return f"CompactRecords({self.model.__name__}, {len(self)} rows)"
+
+    def column(self, name: str, decoded: bool = True) -> list:
+        shape = self._layout
+        if decoded:
+            return [shape.decoded(row, name) for row in self._rows]
+        i = shape.index[name]
+        return [shape.raw(row, i) for row in self._rows]
+
+    def filter(self, predicate: Callable[[CompactRecord], bool]) -> "CompactRecords":
+        """Keep matching rows; the row tuples are shared, not copied."""
+        shape = self._layout
+        return CompactRecords(
+            shape, [row for row in self._rows if predicate(CompactRecord(shape, row))]
+        )
+
+    def project(self, fields: Iterable[str]) -> "CompactRecords":
+        """Only the named fields, like ConstituentListQuery.fields.
+
+        Projected rows still turn into models with to_model() as long as the
+        model's required fields are among them.
+        """
+        return CompactRecords.from_json(
+            self.model, (self._layout.unpack(row) for row in self._rows), fields
+        )
+
+    def models(self) -> Iterator[BaseModel]:
+        for record in self:
+            yield record.to_model()
+
+
+def compact_collection(response_model: type[BaseModel], data: dict) -> dict:
+    """Swap a Collection payload's value list for CompactRecords in place."""
+    item = _list_model_in(response_model.model_fields["value"].annotation)
+    if item is None or not isinstance(data.get("value"), list):
+        raise TypeError(f"{response_model.__name__} is not a collection of models")
+    data["value"] = CompactRecords.from_json(item, data["value"])
+    return data
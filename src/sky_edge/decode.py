@@ -0,0 +1,166 @@
+import threading
+import time
+import types
+from dataclasses import dataclass, field
+from enum import StrEnum
+from typing import Any, Callable, Union, get_args, get_origin
+
+from pydantic import BaseModel
+from pydantic_core import from_json
+
+from .compact import compact_collection
+
+
+class DecodeMode(StrEnum):
+    # full pydantic validation, the default
+    VALIDATE = "validate"
+    # plain dicts and lists straight from the JSON parser
+    RAW = "raw"
+    # collections only: value becomes CompactRecords (see compact.py)
+    COMPACT = "compact"
+
+
+_Converter = Callable[[Any], Any]
+
+
+@dataclass
+class _Plan:
+    defaults: dict[str, Any]
+    factories: dict[str, Callable[[], Any]]
+    # fields holding nested models, with the function that builds them
+    nested: dict[str, _Converter]
+
+
+_plans: dict[type[BaseModel], _Plan] = {}
+
+
+def _model_in(annotation) -> type[BaseModel] | None:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    return None
+
+
+def _converter(annotation) -> _Converter | None:
+    if model := _model_in(annotation):
+        return lambda v: construct(model, v) if isinstance(v, dict) else v
+    origin = get_origin(annotation)
+    if origin in (Union, types.UnionType):
+        converters = [c for a in get_args(annotation) if (c := _converter(a))]
+        return converters[0] if len(converters) == 1 else None
+    if origin is list:
+        (item,) = get_args(annotation) or (None,)
+        if (convert := _converter(item)) is not None:
+            return lambda v: [convert(i) for i in v] if isinstance(v, list) else v
+    return None
+
+
+def _plan(model: type[BaseModel]) -> _Plan:
+    # worked out once per model class
+    plan = _plans.get(model)
+    if plan is None:
+        fields = model.model_fields
+        plan = _Plan(
+            defaults={
+                name: info.default
+                for name, info in fields.items()
+                if not info.is_required() and info.default_factory is None
+            },
+            factories={
+                name: info.default_factory
+                for name, info in fields.items()
+                if info.default_factory is not None
+            },
+            nested={
+                name: convert
+                for name, info in fields.items()
+                if (convert := _converter(info.annotation)) is not None
+            },
+        )
+        _plans[model] = plan
+    return plan
+
+
+def construct(model: type[BaseModel], data: dict) -> BaseModel:
+    """Build a model from trusted JSON data without validating it.
+
+    Like model_construct, but nested models and lists of models are built
+    too and the per-field default handling is precomputed per class. Values
+    keep their JSON types, so this is only used to wrap COMPACT pages.
+    """
+    plan = _plan(model)
+    for name, convert in plan.nested.items():
+        if (value := data.get(name)) is not None:
+            data[name] = convert(value)
+    values = {**plan.defaults, **data}
+    for name, factory in plan.factories.items():
+        if name not in data:
+            values[name] = factory()
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", values)
+    object.__setattr__(instance, "__pydantic_fields_set__", set(data))
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    object.__setattr__(instance, "__pydantic_private__", None)
+    return instance
+
+
+@dataclass
+class ModeStats:
+    calls: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+
+    @property
+    def seconds_per_mb(self) -> float | None:
+        return self.seconds / (self.bytes / 1e6) if self.bytes else None
+
+
+@dataclass
+class DecodeStats:
+    modes: dict[DecodeMode, ModeStats] = field(
+        default_factory=lambda: {mode: ModeStats() for mode in DecodeMode}
+    )
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, mode: DecodeMode, size: int, seconds: float) -> None:
+        with self._lock:
+            stats = self.modes[mode]
+            stats.calls += 1
+            stats.bytes += size
+            stats.seconds += seconds
+
+    def saved_seconds(self) -> dict[DecodeMode, float]:
+        """Estimated time each faster mode saved over full validation.
+
+        Uses the measured validation cost per byte, so it needs at least one
+        validated response to compare against.
+        """
+        baseline = self.modes[DecodeMode.VALIDATE].seconds_per_mb
+        if baseline is None:
+            return {}
+        return {
+            mode: stats.bytes / 1e6 * baseline - stats.seconds
+            for mode, stats in self.modes.items()
+            if mode != DecodeMode.VALIDATE and stats.bytes
+        }
+
+
+def decode(
+    response_model: type[BaseModel],
+    content: bytes,
+    mode: DecodeMode = DecodeMode.VALIDATE,
+    stats: DecodeStats | None = None,
+) -> BaseModel | dict | list:
+    """Parse a response body straight from bytes in the requested mode."""
+    started = time.perf_counter()
+    match mode:
+        case DecodeMode.VALIDATE:
+            result = response_model.model_validate_json(content)
+        case DecodeMode.RAW:
+            result = from_json(content)
+        case DecodeMode.COMPACT:
+            # cache_strings dedupes repeated values while parsing
+            data = from_json(content, cache_strings="all")
+            result = construct(response_model, compact_collection(response_model, data))
+    if stats is not None:
+        stats.record(mode, len(content), time.perf_counter() - started)
+    return result
@@ -0,0 +1,232 @@
+import csv
+import json
+import os
+import types
+from contextlib import contextmanager
+from datetime import date, datetime
+from itertools import islice
+from typing import IO, Any, Iterable, Iterator, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+from .util import FuzzyDate
+
+DEFAULT_BATCH_SIZE = 10_000
+
+
+def _pyarrow():
+    try:
+        # binds pyarrow, with the parquet submodule loaded
+        import pyarrow.parquet
+    except ImportError as e:  # pragma: no cover
+        raise ImportError(
+            "Arrow/Parquet export requires pyarrow,"
+            " install with `pip install sky-edge[export]`"
+        ) from e
+    return pyarrow
+
+
+def _unwrap(annotation):
+    # Optional[X] / X | None -> X
+    if get_origin(annotation) in (Union, types.UnionType):
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _arrow_type(annotation):
+    pa = _pyarrow()
+    annotation = _unwrap(annotation)
+    if annotation is FuzzyDate:
+        return pa.struct([("y", pa.int16()), ("m", pa.int8()), ("d", pa.int8())])
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return pa.struct(list(arrow_schema(annotation)))
+    if get_origin(annotation) is list:
+        (item,) = get_args(annotation)
+        return pa.list_(_arrow_type(item))
+    if isinstance(annotation, type):
+        if issubclass(annotation, bool):
+            return pa.bool_()
+        if issubclass(annotation, int):
+            return pa.int64()
+        if issubclass(annotation, float):
+            return pa.float64()
+        if issubclass(annotation, datetime):
+            return pa.timestamp("us", tz="UTC")
+        if issubclass(annotation, date):
+            return pa.date32()
+    return pa.string()
+
+
+def arrow_schema(model: type[BaseModel], fields: Iterable[str] | None = None):
+    """Arrow schema for a model: FuzzyDate and nested models become structs,
+    datetimes UTC timestamps, everything unrecognised a string column."""
+    pa = _pyarrow()
+    wanted = None if fields is None else set(fields)
+    return pa.schema(
+        [
+            pa.field(name, _arrow_type(info.annotation), nullable=True)
+            for name, info in model.model_fields.items()
+            if wanted is None or name in wanted
+        ]
+    )
+
+
+def _batches(records: Iterable, batch_size: int) -> Iterator[list]:
+    source = iter(records)
+    while batch := list(islice(source, batch_size)):
+        yield batch
+
+
+def _row(record: BaseModel | dict, fields: Iterable[str] | None = None) -> dict:
+    if isinstance(record, dict):
+        return record
+    return record.model_dump(include=None if fields is None else set(fields))
+
+
+def record_batches(
+    records: Iterable[BaseModel],
+    model: type[BaseModel],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    fields: Iterable[str] | None = None,
+):
+    """Turn a stream of models into Arrow RecordBatches of `batch_size` rows."""
+    pa = _pyarrow()
+    fields = None if fields is None else list(fields)
+    schema = arrow_schema(model, fields)
+    for batch in _batches(records, batch_size):
+        yield pa.RecordBatch.from_pylist(
+            [_row(r, fields) for r in batch], schema=schema
+        )
+
+
+@contextmanager
+def _open(target: str | os.PathLike | IO, mode: str) -> Iterator[IO]:
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, mode, newline="" if "b" not in mode else None) as f:
+            yield f
+    else:
+        yield target
+
+
+def export_parquet(
+    records: Iterable[BaseModel],
+    target: str | os.PathLike | IO,
+    model: type[BaseModel],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    fields: Iterable[str] | None = None,
+    compression: str = "zstd",
+) -> int:
+    """Stream records into a Parquet file one row group per batch.
+
+    Memory is bounded by `batch_size`, not by the size of the collection,
+    so `records` can be `Collection.iter_all()` or a bulk listing directly.
+    """
+    pa = _pyarrow()
+    fields = None if fields is None else list(fields)
+    schema = arrow_schema(model, fields)
+    rows = 0
+    with pa.parquet.ParquetWriter(target, schema, compression=compression) as writer:
+        for batch in record_batches(records, model, batch_size, fields):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def export_arrow(
+    records: Iterable[BaseModel],
+    target: str | os.PathLike | IO,
+    model: type[BaseModel],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    fields: Iterable[str] | None = None,
+) -> int:
+    """Stream records into an Arrow IPC (Feather v2) file."""
+    pa = _pyarrow()
+    fields = None if fields is None else list(fields)
+    schema = arrow_schema(model, fields)
+    rows = 0
+    with pa.ipc.new_file(target, schema) as writer:
+        for batch in record_batches(records, model, batch_size, fields):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def export_ndjson(
+    records: Iterable[BaseModel | dict],
+    target: str | os.PathLike | IO,
+    exclude_none: bool = True,
+) -> int:
+    """One JSON document per line, written record by record."""
+    rows = 0
+    with _open(target, "w") as f:
+        for record in records:
+            if isinstance(record, dict):
+                f.write(json.dumps(record, default=str))
+            else:
+                f.write(record.model_dump_json(exclude_none=exclude_none))
+            f.write("\n")
+            rows += 1
+    return rows
+
+
+def _fuzzy(value: dict) -> str | None:
+    # ISO-style partial date: 1990, 1990-04 or 1990-04-12
+    parts = [
+        f"{value['y']:04d}" if value.get("y") else None,
+        f"{value['m']:02d}" if value.get("m") else None,
+        f"{value['d']:02d}" if value.get("d") else None,
+    ]
+    text = "-".join(p for p in parts if p)
+    return text or None
+
+
+def _csv_columns(model: type[BaseModel]) -> list[tuple[str, ...]]:
+    columns = []
+    for name, info in model.model_fields.items():
+        annotation = _unwrap(info.annotation)
+        if (
+            isinstance(annotation, type)
+            and issubclass(annotation, BaseModel)
+            and annotation is not FuzzyDate
+        ):
+            columns.extend((name, *path) for path in _csv_columns(annotation))
+        else:
+            columns.append((name,))
+    return columns
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict) and value.keys() <= {"d", "m", "y"}:
+        return _fuzzy(value)
+    if isinstance(value, list):
+        return ";".join(str(v) for v in value)
+    return value
+
+
+def export_csv(
+    records: Iterable[BaseModel],
+    target: str | os.PathLike | IO,
+    model: type[BaseModel],
+) -> int:
+    """Flat CSV: nested models become dotted columns (address.city),
+    FuzzyDate a partial ISO date and lists semicolon-joined values."""
+    columns = _csv_columns(model)
+    rows = 0
+    with _open(target, "w") as f:
+        writer = csv.writer(f)
+        writer.writerow([".".join(path) for path in columns])
+        for record in records:
+            row = _row(record)
+            values = []
+            for path in columns:
+                value = row
+                for key in path:
+                    value = value.get(key) if isinstance(value, dict) else None
+                values.append(_csv_value(value))
+            writer.writerow(values)
+            rows += 1
+    return rows
@@ -0,0 +1,206 @@
+from array import array
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Any, Iterable, Mapping
+
+from .compact import CompactRecord
+
+# commitments and their write-offs, money only arrives as payments
+COMMITMENT_TYPES = frozenset(
+    {
+        "Pledge",
+        "RecurringGift",
+        "MatchingGiftPledge",
+        "PledgeWriteOff",
+        "MatchingGiftWriteOff",
+    }
+)
+
+_EPOCH = date(1970, 1, 1)
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as e:  # pragma: no cover
+        raise ImportError(
+            "Giving aggregates require numpy,"
+            " install with `pip install sky-edge[analytics]`"
+        ) from e
+    return numpy
+
+
+def _field(gift: Any, name: str) -> Any:
+    if isinstance(gift, Mapping):
+        return gift.get(name)
+    if isinstance(gift, CompactRecord):
+        # skip decoding, the raw JSON values are all that is needed here
+        return gift.raw(name)
+    return getattr(gift, name, None)
+
+
+@lru_cache(maxsize=65536)
+def _iso_day(value: str) -> int:
+    # gift dates repeat a lot, parse each distinct string once
+    return _day(datetime.fromisoformat(value))
+
+
+def _day(value: Any) -> int | None:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return _iso_day(value)
+    if isinstance(value, datetime):
+        value = value.date()
+    return (value - _EPOCH).days
+
+
+@dataclass
+class GiftArrays:
+    """Gifts as parallel NumPy columns, one row per gift.
+
+    `donor` indexes into `donors`, the constituent ids in order of first
+    appearance, so every per-donor result below is an array aligned with
+    `donors`.
+    """
+
+    amount: Any  # float64
+    day: Any  # datetime64[D]
+    donor: Any  # int32
+    donors: list[str]
+
+    @classmethod
+    def from_gifts(
+        cls,
+        gifts: Iterable[Any],
+        exclude_types: Iterable[str] = COMMITMENT_TYPES,
+    ) -> "GiftArrays":
+        """Load Gift models, compact records or raw dicts.
+
+        Commitments (pledges, recurring gift schedules) and their
+        write-offs are skipped by default, so payments against them are not
+        counted twice and nothing written off counts as given; gifts
+        without a date, amount or constituent are skipped too.
+        """
+        np = _numpy()
+        exclude = frozenset(exclude_types)
+        amounts = array("d")
+        days = array("q")
+        donor = array("q")
+        index: dict[str, int] = {}
+        for gift in gifts:
+            if _field(gift, "type") in exclude:
+                continue
+            amount = _field(gift, "amount")
+            day = _day(_field(gift, "date"))
+            constituent_id = _field(gift, "constituent_id")
+            if amount is None or day is None or constituent_id is None:
+                continue
+            amounts.append(_field(amount, "value"))
+            days.append(day)
+            donor.append(index.setdefault(constituent_id, len(index)))
+        return cls(
+            amount=np.frombuffer(amounts, dtype=np.float64),
+            day=np.frombuffer(days, dtype=np.int64).astype("datetime64[D]"),
+            donor=np.frombuffer(donor, dtype=np.int64).astype(np.int32),
+            donors=list(index),
+        )
+
+    def __len__(self) -> int:
+        return len(self.amount)
+
+    def _totals(self, mask=None):
+        np = _numpy()
+        if mask is None:
+            return np.bincount(self.donor, self.amount, minlength=len(self.donors))
+        return np.bincount(
+            self.donor[mask], self.amount[mask], minlength=len(self.donors)
+        )
+
+    def lifetime_totals(self):
+        return self._totals()
+
+    def gift_counts(self):
+        return _numpy().bincount(self.donor, minlength=len(self.donors))
+
+    def totals_between(self, start: date, end: date):
+        """Per-donor totals of gifts dated start..end inclusive."""
+        np = _numpy()
+        low, high = np.datetime64(start, "D"), np.datetime64(end, "D")
+        return self._totals((self.day >= low) & (self.day <= high))
+
+    def rolling_totals(self, as_of: date, days: int = 365):
+        """Per-donor totals over the `days` days ending on `as_of`."""
+        return self.totals_between(as_of - timedelta(days=days - 1), as_of)
+
+    def fiscal_years(self, start_month: int = 1):
+        """Fiscal year of each gift, named by the calendar year it ends in."""
+        np = _numpy()
+        months = self.day.astype("datetime64[M]").astype(np.int64)
+        year = months // 12 + 1970
+        if start_month == 1:
+            return year
+        return year + (months % 12 + 1 >= start_month)
+
+    def fiscal_year_totals(self, start_month: int = 1):
+        """(years, totals) where totals[donor, i] is given in years[i]."""
+        np = _numpy()
+        fy = self.fiscal_years(start_month)
+        if not len(fy):
+            return np.empty(0, np.int64), np.zeros((len(self.donors), 0))
+        first = fy.min()
+        years = np.arange(first, fy.max() + 1)
+        cells = self.donor.astype(np.int64) * len(years) + (fy - first)
+        totals = np.bincount(
+            cells, self.amount, minlength=len(self.donors) * len(years)
+        )
+        return years, totals.reshape(len(self.donors), len(years))
+
+    def _ends(self):
+        # gift positions sorted by donor then date, and where each donor's
+        # run starts and ends
+        np = _numpy()
+        order = np.lexsort((self.day, self.donor))
+        sorted_donor = self.donor[order]
+        starts = np.flatnonzero(np.r_[True, sorted_donor[1:] != sorted_donor[:-1]])
+        ends = np.r_[starts[1:], len(order)] - 1
+        return order, starts, ends
+
+    def first_gifts(self):
+        """(dates, amounts) of each donor's first gift."""
+        order, starts, _ = self._ends()
+        return self.day[order[starts]], self.amount[order[starts]]
+
+    def last_gifts(self):
+        """(dates, amounts) of each donor's latest gift."""
+        order, _, ends = self._ends()
+        return self.day[order[ends]], self.amount[order[ends]]
+
+    def _gave_in(self, fy, years):
+        np = _numpy()
+        gave = np.zeros(len(self.donors), dtype=bool)
+        gave[self.donor[np.isin(fy, years)]] = True
+        return gave
+
+    def lybunt(self, fiscal_year: int, start_month: int = 1):
+        """Mask of donors who gave Last Year But Unfortunately Not This year."""
+        fy = self.fiscal_years(start_month)
+        return self._gave_in(fy, [fiscal_year - 1]) & ~self._gave_in(fy, [fiscal_year])
+
+    def sybunt(self, fiscal_year: int, start_month: int = 1):
+        """Mask of donors who gave Some Year before last But not last or this."""
+        np = _numpy()
+        fy = self.fiscal_years(start_month)
+        earlier = np.unique(fy[fy < fiscal_year - 1])
+        return self._gave_in(fy, earlier) & ~self._gave_in(
+            fy, [fiscal_year - 1, fiscal_year]
+        )
+
+    def donor_ids(self, mask) -> list[str]:
+        """Constituent ids selected by a per-donor boolean mask."""
+        return [self.donors[i] for i in _numpy().flatnonzero(mask)]
+
+    def by_donor(self, values) -> dict[str, Any]:
+        """A per-donor array as {constituent_id: value}."""
+        return dict(zip(self.donors, values.tolist()))
@@ -0,0 +1,346 @@
+import bisect
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Iterator
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# span names emitted by the client
+API_REQUEST = "sky.api_request"  # one api_request call, parent of the rest
+REQUEST = "sky.request"  # generic_request, including cache and retries
+HTTP = "sky.http"  # a single attempt on the wire
+DECODE = "sky.decode"  # parsing the response body
+TOKEN = "sky.token"  # OAuth token grant or refresh
+
+Hook = Callable[["Span"], None]
+
+# replaced rather than mutated, so a span can iterate it without copying
+_hooks: tuple[Hook, ...] = ()
+_hooks_lock = threading.Lock()
+_current: ContextVar["Span | None"] = ContextVar("sky_edge_span", default=None)
+
+
+@dataclass
+class Span:
+    """A finished unit of work, shaped like an OpenTelemetry span."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_ns: int
+    end_ns: int = 0
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+    @property
+    def seconds(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_otlp(self) -> dict:
+        """OTLP/JSON encoding of the span."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": 3 if self.name == HTTP else 1,  # CLIENT / INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items()
+                if value is not None
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class _NoSpan:
+    # handed out when nobody is listening, so instrumentation costs nothing
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def add_hook(hook: Hook) -> Callable[[], None]:
+    """Call `hook` with every finished Span; returns a function removing it."""
+    global _hooks
+    with _hooks_lock:
+        _hooks = (*_hooks, hook)
+    return lambda: remove_hook(hook)
+
+
+def remove_hook(hook: Hook) -> None:
+    global _hooks
+    with _hooks_lock:
+        if hook in _hooks:
+            i = _hooks.index(hook)
+            _hooks = _hooks[:i] + _hooks[i + 1 :]
+
+
+@contextmanager
+def span(
+    name: str, url: str | None = None, **attributes: Any
+) -> Iterator[Span | _NoSpan]:
+    """Time the block as a child of the current span and hand it to the hooks.
+
+    `url` is recorded as its endpoint template. Without hooks this yields a
+    no-op stand-in and does no other work.
+    """
+    if not _hooks:
+        yield _NO_SPAN
+        return
+    if url is not None:
+        attributes["endpoint"] = endpoint(url)
+    parent = _current.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else f"{random.getrandbits(128):032x}",
+        span_id=f"{random.getrandbits(64):016x}",
+        parent_id=parent.span_id if parent else None,
+        start_ns=time.time_ns(),
+        attributes=attributes,
+    )
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        current.end_ns = time.time_ns()
+        for hook in _hooks:
+            try:
+                hook(current)
+            except Exception:
+                logger.exception("metrics hook %r failed", hook)
+
+
+_ID = re.compile(r"^(?!v\d+$).*\d.*$|^[0-9a-f-]{32,36}$", re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def endpoint(url: str) -> str:
+    """URL path with record ids templated out, for low-cardinality labels.
+
+    /constituent/v1/constituents/280/addresses becomes
+    /constituent/v1/constituents/{id}/addresses. Version segments stay.
+    """
+    path = urlsplit(url).path or "/"
+    return "/".join("{id}" if _ID.match(part) else part for part in path.split("/"))
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: Any) -> str:
+    inner = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+    return f"{{{inner}}}"
+
+
+class MetricsCollector:
+    """Aggregates spans into counters and histograms per endpoint template.
+
+    Network time is the sky.http attempts, parse time the sky.decode spans,
+    so the two can be compared per endpoint. prometheus() renders the text
+    exposition format for a /metrics handler or a push gateway.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._remove: Callable[[], None] | None = None
+        self.requests: dict[tuple, int] = {}
+        self.latency: dict[tuple, _Histogram] = {}
+        self.bytes_received: dict[tuple, int] = {}
+        self.bytes_sent: dict[tuple, int] = {}
+        self.errors: dict[tuple, int] = {}
+        self.retries: dict[tuple, int] = {}
+        self.cache_hits: dict[tuple, int] = {}
+        self.decode: dict[tuple, _Histogram] = {}
+        self.token_refreshes = 0
+        self.token_seconds = 0.0
+
+    def install(self) -> "MetricsCollector":
+        if self._remove is None:
+            self._remove = add_hook(self)
+        return self
+
+    def uninstall(self) -> None:
+        if self._remove is not None:
+            self._remove()
+            self._remove = None
+
+    def __call__(self, span: Span) -> None:
+        a = span.attributes
+        key = (a.get("http.method"), a.get("endpoint"))
+        with self._lock:
+            if span.name == HTTP:
+                if span.error:
+                    self.errors[key] = self.errors.get(key, 0) + 1
+                else:
+                    status = (*key, a.get("http.status_code"))
+                    self.requests[status] = self.requests.get(status, 0) + 1
+                if a.get("attempt"):
+                    self.retries[key] = self.retries.get(key, 0) + 1
+                if key not in self.latency:
+                    self.latency[key] = _Histogram(self.buckets)
+                self.latency[key].observe(span.seconds)
+                for total, attribute in (
+                    (self.bytes_received, "bytes_received"),
+                    (self.bytes_sent, "bytes_sent"),
+                ):
+                    total[key] = total.get(key, 0) + (a.get(attribute) or 0)
+            elif span.name == REQUEST and a.get("cache_hit"):
+                self.cache_hits[key] = self.cache_hits.get(key, 0) + 1
+            elif span.name == DECODE:
+                decode = (a.get("endpoint"), a.get("decode_mode"))
+                if decode not in self.decode:
+                    self.decode[decode] = _Histogram(self.buckets)
+                self.decode[decode].observe(span.seconds)
+            elif span.name == TOKEN:
+                self.token_refreshes += 1
+                self.token_seconds += span.seconds
+
+    def prometheus(self, prefix: str = "sky_edge") -> str:
+        lines: list[str] = []
+
+        def metric(name: str, kind: str, help: str) -> str:
+            lines.append(f"# HELP {prefix}_{name} {help}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            return f"{prefix}_{name}"
+
+        def histogram(name: str, labels: dict, h: _Histogram) -> None:
+            cumulative = 0
+            for bound, count in zip((*h.buckets, "+Inf"), h.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(**labels)} {h.sum}")
+            lines.append(f"{name}_count{_labels(**labels)} {h.count}")
+
+        with self._lock:
+            name = metric("http_requests_total", "counter", "HTTP responses by status")
+            for (method, path, status), count in sorted(self.requests.items()):
+                labels = _labels(method=method, endpoint=path, status=status)
+                lines.append(f"{name}{labels} {count}")
+            for attr, kind, help in (
+                ("errors", "http_errors_total", "Attempts failing without a response"),
+                ("retries", "http_retries_total", "Attempts after the first"),
+                ("cache_hits", "cache_hits_total", "Requests answered from the cache"),
+                ("bytes_received", "http_received_bytes_total", "Response body bytes"),
+                ("bytes_sent", "http_sent_bytes_total", "Request body bytes"),
+            ):
+                name = metric(kind, "counter", help)
+                for (method, path), value in sorted(getattr(self, attr).items()):
+                    lines.append(
+                        f"{name}{_labels(method=method, endpoint=path)} {value}"
+                    )
+            name = metric(
+                "http_request_duration_seconds", "histogram", "Time on the wire"
+            )
+            for (method, path), h in sorted(self.latency.items()):
+                histogram(name, {"method": method, "endpoint": path}, h)
+            name = metric("decode_duration_seconds", "histogram", "Response parse time")
+            for (path, mode), h in sorted(self.decode.items()):
+                histogram(name, {"endpoint": path, "mode": mode}, h)
+            name = metric("token_refreshes_total", "counter", "OAuth token grants")
+            lines.append(f"{name} {self.token_refreshes}")
+            name = metric("token_refresh_seconds_total", "counter", "OAuth grant time")
+            lines.append(f"{name} {self.token_seconds}")
+        return "\n".join(lines) + "\n"
+
+
+class SpanRecorder:
+    """Keeps the last `max_spans` finished spans for OTLP-style export."""
+
+    def __init__(self, max_spans: int = 10_000) -> None:
+        self._spans: deque[Span] = deque(maxlen=max_spans)
+        self._remove: Callable[[], None] | None = None
+
+    def install(self) -> "SpanRecorder":
+        if self._remove is None:
+            self._remove = add_hook(self)
+        return self
+
+    def uninstall(self) -> None:
+        if self._remove is not None:
+            self._remove()
+            self._remove = None
+
+    def __call__(self, span: Span) -> None:
+        self._spans.append(span)
+
+    def spans(self) -> list[Span]:
+        return list(self._spans)
+
+    def drain(self) -> list[Span]:
+        spans = []
+        while self._spans:
+            spans.append(self._spans.popleft())
+        return spans
+
+    def to_otlp(self, service_name: str = "sky-edge") -> dict:
+        """An OTLP/JSON ExportTraceServiceRequest body for the drained spans."""
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": service_name},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "sky_edge"},
+                            "spans": [s.to_otlp() for s in self.drain()],
+                        }
+                    ],
+                }
+            ]
+        }
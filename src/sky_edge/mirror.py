@@ -0,0 +1,263 @@
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from itertools import islice
+from typing import Callable, Iterable, TypeVar
+
+from pydantic import BaseModel
+
+from .api.constituent import Address, Constituent, Email, Phone, Relationship
+from .compact import CompactRecord
+from .util import base_model, projected_model
+
+M = TypeVar("M", bound=BaseModel)
+
+# sorts after every character a name can continue with
+_MAX_CHAR = chr(0x10FFFF)
+
+
+@dataclass(frozen=True, eq=False)
+class _Table:
+    name: str
+    model: type[BaseModel]
+    # indexed columns pulled out of the record next to the JSON body
+    columns: dict[str, Callable[[BaseModel], object]]
+    indexes: tuple[str, ...]
+
+
+_TABLES = {
+    table.model: table
+    for table in (
+        _Table(
+            name="constituents",
+            model=Constituent,
+            columns={
+                "lookup_id": lambda r: r.lookup_id,
+                "name": lambda r: r.name,
+                "last": lambda r: r.last,
+                "postal_code": lambda r: r.address.postal_code if r.address else None,
+            },
+            indexes=(
+                "lookup_id",
+                "name COLLATE NOCASE",
+                "last COLLATE NOCASE",
+                "postal_code",
+            ),
+        ),
+        _Table(
+            name="addresses",
+            model=Address,
+            columns={
+                "constituent_id": lambda r: r.constituent_id,
+                "postal_code": lambda r: r.postal_code,
+            },
+            indexes=("constituent_id", "postal_code"),
+        ),
+        _Table(
+            name="emails",
+            model=Email,
+            columns={
+                "constituent_id": lambda r: r.constituent_id,
+                "address": lambda r: r.address,
+            },
+            indexes=("constituent_id", "address COLLATE NOCASE"),
+        ),
+        _Table(
+            name="phones",
+            model=Phone,
+            columns={
+                "constituent_id": lambda r: r.constituent_id,
+                "number": lambda r: r.number,
+            },
+            indexes=("constituent_id", "number"),
+        ),
+        _Table(
+            name="relationships",
+            model=Relationship,
+            columns={
+                "constituent_id": lambda r: r.constituent_id,
+                "relation_id": lambda r: r.relation_id,
+            },
+            indexes=("constituent_id", "relation_id"),
+        ),
+    )
+}
+
+
+def _table_for(model: type) -> _Table:
+    # projections and subclasses are stored with the model they come from
+    for cls in base_model(model).__mro__:
+        if (table := _TABLES.get(cls)) is not None:
+            return table
+    kinds = ", ".join(m.__name__ for m in _TABLES)
+    raise TypeError(f"ConstituentMirror stores {kinds} models, not {model.__name__}")
+
+
+def _column(get: Callable[[BaseModel], object], record: BaseModel) -> object:
+    try:
+        return get(record)
+    except AttributeError:
+        # a projection without the field
+        return None
+
+
+def _from_compact(record: CompactRecord) -> BaseModel:
+    model = record._layout.model
+    fields = record._layout.fields
+    if not model.model_fields.keys() - fields:
+        return record.to_model()
+    # a compact page of some fields is a projection of the full model
+    return projected_model(base_model(model), fields).model_validate(record.to_dict())
+
+
+class ConstituentMirror:
+    """Local SQLite copy of constituent records for network-free lookups.
+
+    Records are stored as their JSON form next to a few indexed columns
+    (id, lookup_id, name, email address, postal code, constituent_id) and
+    come back out as the same pydantic models. Feed it with `upsert`, which
+    fits both SyncEngine callbacks and batches from the bulk listings.
+
+    Projected models, and compact records holding some of their model's
+    fields, are merged into the stored record of the model they come from;
+    a record the mirror does not hold yet is stored with just those fields,
+    so project at least the model's required ones. Dicts need validating
+    into a model first.
+    """
+
+    def __init__(self, path: str | os.PathLike = ":memory:") -> None:
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        for table in _TABLES.values():
+            columns = "".join(f", {c} TEXT" for c in table.columns)
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table.name}"
+                f" (id TEXT PRIMARY KEY{columns}, data TEXT NOT NULL)"
+            )
+            for index in table.indexes:
+                column = index.split()[0]
+                self._db.execute(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table.name}_{column}"
+                    f" ON {table.name} ({index})"
+                )
+        self._db.commit()
+
+    def upsert(self, records: Iterable[BaseModel | CompactRecord]) -> int:
+        # (table, partial) -> rows
+        rows: dict[tuple[_Table, bool], list[tuple]] = {}
+        for record in records:
+            if isinstance(record, CompactRecord):
+                record = _from_compact(record)
+            table = _table_for(type(record))
+            partial = base_model(type(record)) is not type(record)
+            rows.setdefault((table, partial), []).append(
+                (
+                    record.id,
+                    *(_column(get, record) for get in table.columns.values()),
+                    record.model_dump_json(exclude_none=True),
+                )
+            )
+        with self._lock:
+            for (table, partial), values in rows.items():
+                placeholders = ", ".join("?" * (len(table.columns) + 2))
+                if partial:
+                    # fields the projection lacks keep their stored value
+                    kept = "".join(
+                        f"{c} = coalesce(excluded.{c}, {c}), " for c in table.columns
+                    )
+                    self._db.executemany(
+                        f"INSERT INTO {table.name} VALUES ({placeholders})"
+                        f" ON CONFLICT (id) DO UPDATE SET {kept}"
+                        "data = json_patch(data, excluded.data)",
+                        values,
+                    )
+                else:
+                    self._db.executemany(
+                        f"INSERT OR REPLACE INTO {table.name} VALUES ({placeholders})",
+                        values,
+                    )
+            self._db.commit()
+        return sum(len(values) for values in rows.values())
+
+    def load(self, records: Iterable[BaseModel], batch_size: int = 5000) -> int:
+        source = iter(records)
+        total = 0
+        while batch := list(islice(source, batch_size)):
+            total += self.upsert(batch)
+        return total
+
+    def delete(self, model: type[BaseModel], ids: Iterable[str]) -> None:
+        with self._lock:
+            self._db.executemany(
+                f"DELETE FROM {_table_for(model).name} WHERE id = ?",
+                [(i,) for i in ids],
+            )
+            self._db.commit()
+
+    def _select(self, model: type[M], where: str, *args) -> list[M]:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT data FROM {_table_for(model).name} WHERE {where}", args
+            ).fetchall()
+        return [model.model_validate_json(row[0]) for row in rows]
+
+    def _constituents_for(self, table: str, where: str, *args) -> list[Constituent]:
+        return self._select(
+            Constituent,
+            f"id IN (SELECT constituent_id FROM {table} WHERE {where})",
+            *args,
+        )
+
+    def constituent(self, constituent_id: str) -> Constituent | None:
+        found = self._select(Constituent, "id = ?", constituent_id)
+        return found[0] if found else None
+
+    def constituent_by_lookup_id(self, lookup_id: str) -> Constituent | None:
+        found = self._select(Constituent, "lookup_id = ?", lookup_id)
+        return found[0] if found else None
+
+    def constituents_by_name(self, prefix: str, limit: int = 100) -> list[Constituent]:
+        # a range over the indexed NOCASE expressions; unlike LIKE it takes
+        # % and _ in the prefix literally and needs no LIKE optimization
+        end = prefix + _MAX_CHAR
+        return self._select(
+            Constituent,
+            "(name COLLATE NOCASE >= ? AND name COLLATE NOCASE < ?)"
+            " OR (last COLLATE NOCASE >= ? AND last COLLATE NOCASE < ?) LIMIT ?",
+            prefix,
+            end,
+            prefix,
+            end,
+            limit,
+        )
+
+    def constituents_by_email(self, address: str) -> list[Constituent]:
+        return self._constituents_for("emails", "address COLLATE NOCASE = ?", address)
+
+    def constituents_by_postal_code(self, postal_code: str) -> list[Constituent]:
+        return self._select(
+            Constituent,
+            "postal_code = ? OR id IN"
+            " (SELECT constituent_id FROM addresses WHERE postal_code = ?)",
+            postal_code,
+            postal_code,
+        )
+
+    def addresses(self, constituent_id: str) -> list[Address]:
+        return self._select(Address, "constituent_id = ?", constituent_id)
+
+    def emails(self, constituent_id: str) -> list[Email]:
+        return self._select(Email, "constituent_id = ?", constituent_id)
+
+    def phones(self, constituent_id: str) -> list[Phone]:
+        return self._select(Phone, "constituent_id = ?", constituent_id)
+
+    def relationships(self, constituent_id: str) -> list[Relationship]:
+        return self._select(Relationship, "constituent_id = ?", constituent_id)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
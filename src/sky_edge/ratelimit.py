@@ -0,0 +1,158 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Iterator
+
+from requests import Response
+
+# Blackbaud's standard subscription tier allows 10 calls per second
+SKY_STANDARD_RATE = 10.0
+
+
+@dataclass
+class ThrottleStats:
+    requests: int = 0
+    throttled_requests: int = 0
+    throttled_seconds: float = 0.0
+    retries: int = 0
+    rate_limited_responses: int = 0
+    backoff_seconds: float = 0.0
+
+
+class RateLimiter:
+    """Token bucket plus concurrency cap shared by every thread of a process.
+
+    `rate` is requests per second with bursts of up to `burst` requests,
+    `max_concurrency` bounds the number of requests in flight. Either can be
+    None to disable that limit. `pause` blocks every caller until a deadline,
+    which is how a Retry-After from one thread slows down all of them.
+    """
+
+    def __init__(
+        self,
+        rate: float | None = None,
+        burst: int | None = None,
+        max_concurrency: int | None = None,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst or max(1, int(rate or 1))
+        self.stats = ThrottleStats()
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._slots = (
+            threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        )
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self.rate is None:
+                return 0.0
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self) -> None:
+        waited = 0.0
+        while (delay := self._reserve()) > 0:
+            time.sleep(delay)
+            waited += delay
+        with self._lock:
+            self.stats.requests += 1
+            if waited:
+                self.stats.throttled_requests += 1
+                self.stats.throttled_seconds += waited
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def record_retry(self, delay: float, rate_limited: bool) -> None:
+        with self._lock:
+            self.stats.retries += 1
+            self.stats.backoff_seconds += delay
+            if rate_limited:
+                self.stats.rate_limited_responses += 1
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        if self._slots is None:
+            self.acquire()
+            yield
+            return
+        started = time.monotonic()
+        with self._slots:
+            waited = time.monotonic() - started
+            if waited > 0.001:
+                with self._lock:
+                    self.stats.throttled_seconds += waited
+            self.acquire()
+            yield
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class RetryPolicy:
+    """Decides whether and how long to wait before re-sending a request.
+
+    429 is retried for every method since the server did not act on it;
+    5xx responses and connection errors only for idempotent methods.
+    Backoff is exponential with full jitter. A Retry-After header is
+    honoured as given, unless it asks for more than `max_retry_after`
+    seconds (a spent daily quota, say) and the response is returned
+    instead of sleeping that long; None waits however long it says.
+    """
+
+    max_retries: int = 5
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    max_retry_after: float | None = 600.0
+    retry_statuses: frozenset[int] = frozenset({429, 500, 502, 503, 504})
+    # plain strings so util can import this module, HttpMethods compares equal
+    idempotent_methods: frozenset[str] = frozenset(
+        {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+    )
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def can_retry(self, method: str, attempt: int) -> bool:
+        return attempt < self.max_retries and method in self.idempotent_methods
+
+    def delay_for(self, method: str, response: Response, attempt: int) -> float | None:
+        if attempt >= self.max_retries:
+            return None
+        if response.status_code not in self.retry_statuses:
+            return None
+        if response.status_code != 429 and method not in self.idempotent_methods:
+            return None
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            if self.max_retry_after is not None and retry_after > self.max_retry_after:
+                return None
+            return retry_after
+        return self.backoff(attempt)
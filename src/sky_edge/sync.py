@@ -0,0 +1,207 @@
+import json
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+from pydantic import BaseModel
+from requests import HTTPError, Response
+
+from .api.constituent import (
+    CollectionOfAddresses,
+    CollectionOfConstituents,
+    CollectionOfEmails,
+    CollectionOfPhones,
+    ConstituentListQuery,
+    address_list_all_get,
+    constituent_list_get,
+    email_list_all_get,
+    phone_list_all_get,
+)
+from .bulk import MAX_PAGE_SIZE
+from .util import Collection, HttpMethods, api_request
+
+
+class SyncState(BaseModel):
+    resource: str
+    # high-water mark: the newest date_modified seen by a completed run
+    last_modified: datetime | None = None
+    # set while a run is in progress so an interrupted run resumes here
+    next_link: str | None = None
+    run_high_water: datetime | None = None
+    records: int = 0
+
+
+class SyncStateFile:
+    """All resources' SyncState in one JSON file, replaced atomically."""
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict:
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def load(self, resource: str) -> SyncState:
+        with self._lock:
+            raw = self._read().get(resource)
+        if raw is None:
+            return SyncState(resource=resource)
+        return SyncState.model_validate(raw)
+
+    def save(self, state: SyncState) -> None:
+        with self._lock:
+            states = self._read()
+            states[state.resource] = state.model_dump(mode="json")
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".sync-")
+            with os.fdopen(fd, "w") as f:
+                json.dump(states, f)
+            os.replace(tmp, self.path)
+
+
+def _params(since: datetime | None, limit: int) -> dict:
+    params = {"limit": limit, "include_inactive": True}
+    if since is not None:
+        params["last_modified"] = since.isoformat()
+    return params
+
+
+@dataclass(frozen=True)
+class SyncResource:
+    name: str
+    collection: type[Collection]
+    # fetch(last_modified, limit) returns the first page of changes
+    fetch: Callable[[datetime | None, int], Collection | Response]
+
+
+RESOURCES = {
+    resource.name: resource
+    for resource in (
+        SyncResource(
+            name="constituents",
+            collection=CollectionOfConstituents,
+            fetch=lambda since, limit: constituent_list_get(
+                ConstituentListQuery(
+                    last_modified=since,
+                    limit=limit,
+                    include_inactive=True,
+                    include_deceased=True,
+                )
+            ),
+        ),
+        SyncResource(
+            name="emails",
+            collection=CollectionOfEmails,
+            fetch=lambda since, limit: email_list_all_get(params=_params(since, limit)),
+        ),
+        SyncResource(
+            name="addresses",
+            collection=CollectionOfAddresses,
+            fetch=lambda since, limit: address_list_all_get(
+                params=_params(since, limit)
+            ),
+        ),
+        SyncResource(
+            name="phones",
+            collection=CollectionOfPhones,
+            fetch=lambda since, limit: phone_list_all_get(params=_params(since, limit)),
+        ),
+    )
+}
+
+
+@dataclass
+class SyncReport:
+    resource: str
+    pages: int
+    records: int
+    resumed: bool
+    last_modified: datetime | None
+
+
+class SyncEngine:
+    """Incremental pulls driven by last_modified and next_link/sort_token.
+
+    Each run asks only for records modified on or after the resource's
+    high-water mark and hands every page to `upsert` before recording the
+    page's next_link, which carries the server's sort_token. A run that is
+    interrupted resumes from that link, so delivery is at-least-once and
+    `upsert` should be idempotent. The mark advances only when a run
+    reaches the last page.
+    """
+
+    def __init__(
+        self,
+        state: SyncStateFile | str | os.PathLike,
+        page_size: int = MAX_PAGE_SIZE,
+        prefetch: int = 1,
+    ) -> None:
+        self.state = state if isinstance(state, SyncStateFile) else SyncStateFile(state)
+        self.page_size = page_size
+        self.prefetch = prefetch
+
+    def run(
+        self,
+        resource: str | SyncResource,
+        upsert: Callable[[list], None],
+    ) -> SyncReport:
+        if isinstance(resource, str):
+            resource = RESOURCES[resource]
+        state = self.state.load(resource.name)
+        resumed = state.next_link is not None
+        if resumed:
+            first = api_request(
+                method=HttpMethods.GET,
+                url=state.next_link,
+                response_model=resource.collection,
+            )
+        else:
+            state.run_high_water = state.last_modified
+            first = resource.fetch(state.last_modified, self.page_size)
+        if isinstance(first, Response):
+            raise HTTPError(
+                f"{first.status_code} syncing {resource.name}", response=first
+            )
+
+        pages = records = 0
+        for page in first.iter_pages(prefetch=self.prefetch):
+            if page.value:
+                upsert(page.value)
+                modified = [
+                    m for r in page.value if (m := getattr(r, "date_modified", None))
+                ]
+                if modified:
+                    newest = max(modified)
+                    if state.run_high_water is None or newest > state.run_high_water:
+                        state.run_high_water = newest
+            pages += 1
+            records += len(page.value)
+            state.records += len(page.value)
+            state.next_link = page.next_link
+            self.state.save(state)
+
+        state.last_modified = state.run_high_water
+        state.next_link = None
+        self.state.save(state)
+        return SyncReport(
+            resource=resource.name,
+            pages=pages,
+            records=records,
+            resumed=resumed,
+            last_modified=state.last_modified,
+        )
+
+    def run_all(
+        self, upserts: dict[str, Callable[[list], None]]
+    ) -> dict[str, SyncReport]:
+        return {name: self.run(name, upsert) for name, upsert in upserts.items()}
+
+    def reset(self, resource: str) -> None:
+        self.state.save(SyncState(resource=resource))
@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+import threading
+from contextlib import AbstractContextManager, contextmanager
+from dataclasses import asdict, fields
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, Protocol
+
+if TYPE_CHECKING:
+    from .auth import AppTokens
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+
+class TokenStore(Protocol):
+    """Somewhere AppTokens survive between processes.
+
+    `locked` must exclude other processes sharing the store so that only
+    one of them spends a refresh token at a time.
+    """
+
+    def load(self) -> "AppTokens | None": ...
+
+    def save(self, tokens: "AppTokens") -> None: ...
+
+    def locked(self) -> AbstractContextManager[None]: ...
+
+
+def default_token_path() -> Path:
+    cache = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache) / "sky-edge" / "tokens.json"
+
+
+class FileTokenStore:
+    """JSON token file guarded by an advisory lock on a sibling .lock file.
+
+    Writes go through a temp file and os.replace so readers never see a
+    partial file, and the file is created 0600 since it holds a refresh token.
+    """
+
+    def __init__(self, path: str | os.PathLike | None = None) -> None:
+        self.path = Path(path) if path else default_token_path()
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self._thread_lock = threading.RLock()
+
+    def load(self) -> "AppTokens | None":
+        from .auth import AppTokens
+
+        try:
+            raw = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return None
+        known = {f.name for f in fields(AppTokens)}
+        try:
+            return AppTokens(**{k: v for k, v in raw.items() if k in known})
+        except TypeError:
+            return None
+
+    def save(self, tokens: "AppTokens") -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".tokens-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(asdict(tokens), f)
+            os.chmod(tmp, 0o600)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._thread_lock, open(self.lock_path, "a+") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            elif msvcrt is not None:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+                elif msvcrt is not None:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
@@ -1,12 +1,23 @@
+import queue
+import threading
+import time
 from enum import StrEnum
-from typing import Generic, List, Optional, Type, TypeVar
+from functools import cache
+from typing import Callable, Generic, Iterable, Iterator, List, Optional, Type, TypeVar
 
-from pydantic import BaseModel
-from requests import Response, Session
+from pydantic import BaseModel, create_model
+from requests import ConnectionError, HTTPError, Response, Timeout
 
-from .auth import BB_API_SUBSCRIPTION_KEY, get_auth_token
+from .auth import BB_API_SUBSCRIPTION_KEY, get_token_manager
+from .cache import ResponseCache, cache_key
+from .client import Client, ClientConfig
+from .coalesce import SingleFlight
+from .compact import CompactRecords
+from .decode import DecodeMode, DecodeStats, decode
+from .metrics import API_REQUEST, DECODE, HTTP, REQUEST, span
+from .ratelimit import RateLimiter, RetryPolicy, ThrottleStats
 
-_session = Session()
+_client = Client()
 
 T = TypeVar("T", bound=BaseModel | str | None)
 
@@ -43,36 +54,175 @@ class Collection(BaseModel, Generic[T]):
         if not self.next_link:
             return None
         else:
+            # type(self) keeps the concrete subclass (e.g. CollectionOfConstituents)
+            # so the next page is validated against the same item model
             return api_request(
                 method=HttpMethods.GET,
                 url=self.next_link,
-                response_model=Collection[T],
+                response_model=type(self),
+                # a compact page keeps its following pages compact
+                decode_mode=DecodeMode.COMPACT
+                if isinstance(self.value, CompactRecords)
+                else None,
             )
 
+    def iter_pages(self, prefetch: int = 2) -> Iterator["Collection[T]"]:
+        """Yield this page and every following page by walking next_link.
+
+        With prefetch > 0 a background thread fetches up to `prefetch` pages
+        ahead of the consumer, counting the one in flight, so at most
+        prefetch + 1 pages are held at once. Fetching starts as soon as the
+        first page is requested. A failed page fetch raises
+        requests.HTTPError carrying the Response.
+        """
+        if prefetch <= 0:
+            yield self
+            page = self
+            while (page := _next_page(page)) is not None:
+                yield page
+            return
+
+        pages: queue.Queue = queue.Queue()
+        # one slot per page fetched but not yet taken by the consumer
+        slots = threading.Semaphore(prefetch)
+        stop = threading.Event()
+
+        def acquire() -> bool:
+            while not stop.is_set():
+                if slots.acquire(timeout=0.1):
+                    return True
+            return False
+
+        def worker() -> None:
+            page = self
+            try:
+                while acquire() and (page := _next_page(page)) is not None:
+                    pages.put(page)
+            except BaseException as e:
+                pages.put(e)
+                return
+            pages.put(None)
+
+        # start before handing out the first page so page 2 is fetched
+        # while page 1 is being consumed
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        try:
+            yield self
+            while (item := pages.get()) is not None:
+                slots.release()
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    def iter_all(self, prefetch: int = 2) -> Iterator[T]:
+        """Yield every item across all pages, see iter_pages."""
+        for page in self.iter_pages(prefetch=prefetch):
+            yield from page.value
+
+
+def _next_page(page: Collection[T]) -> Collection[T] | None:
+    result = page.fetch_next()
+    if isinstance(result, Response):
+        raise HTTPError(
+            f"{result.status_code} fetching {page.next_link}", response=result
+        )
+    return result
+
+
+def projected_model(model: Type[BaseModel], fields: Iterable[str]) -> Type[BaseModel]:
+    """A slim copy of `model` holding only `fields` (plus id), all optional.
+
+    Made for the API's `fields` parameter: a projected response parses into
+    this type instead of paying for every attribute of the full record.
+    The generated classes are cached, so the same projection is the same type.
+    """
+    return _projected_model(
+        model, frozenset(fields) | ({"id"} & model.model_fields.keys())
+    )
+
+
+@cache
+def _projected_model(model: Type[BaseModel], fields: frozenset[str]) -> Type[BaseModel]:
+    unknown = fields - model.model_fields.keys()
+    if unknown:
+        raise ValueError(f"{model.__name__} has no fields {sorted(unknown)}")
+    projection = create_model(
+        f"{model.__name__}Projection",
+        __module__=model.__module__,
+        **{
+            name: (Optional[info.annotation], None)
+            for name, info in model.model_fields.items()
+            if name in fields
+        },
+    )
+    _projection_bases[projection] = base_model(model)
+    return projection
+
+
+# projected model -> the model it was projected from
+_projection_bases: dict[Type[BaseModel], Type[BaseModel]] = {}
+
+
+def base_model(model: Type[BaseModel]) -> Type[BaseModel]:
+    """The full model a projected_model was made from, else `model` itself."""
+    return _projection_bases.get(model, model)
+
+
+def projected_collection(
+    model: Type[BaseModel], fields: Iterable[str]
+) -> Type[Collection]:
+    return Collection[projected_model(model, fields)]
+
+
+def get_client() -> Client:
+    return _client
+
+
+def configure_client(
+    config: ClientConfig | None = None, client: Client | None = None
+) -> Client:
+    """Swap the process-wide client, keeping the current throttling state."""
+    global _client
+    previous = _client
+    if client is None:
+        client = Client(
+            config=config or ClientConfig(),
+            rate_limiter=previous.rate_limiter,
+            retry_policy=previous.retry_policy,
+            cache=previous.cache,
+            single_flight=previous.single_flight,
+            decode_stats=previous.decode_stats,
+            check_write=previous.check_write,
+        )
+    _client = client
+    if previous is not client:
+        previous.close()
+    return _client
+
 
 def reify_no_json(
     method: HttpMethods, url: str, headers: dict[str, str], **kwargs
 ) -> Response:
-    return _session.request(method=method, url=url, headers=headers, **kwargs)
+    return _client.request(method=method, url=url, headers=headers, **kwargs)
 
 
 def reify_with_json(
     method: HttpMethods, url: str, headers: dict[str, str], json: str, **kwargs
 ) -> Response:
-    return _session.request(
-        method=method, url=url, headers=headers, json=json, **kwargs
-    )
-
+    return _client.request(method=method, url=url, headers=headers, json=json, **kwargs)
 
-def generic_request(
-    method: HttpMethods, url: str, json=None, drop_headers: bool = False, **kwargs
-) -> Response:
-    # Handle headers parameter - can be dict or list of Header objects
-    incoming_headers = kwargs.pop("headers", None)
 
+def build_headers(
+    incoming_headers=None, drop_headers: bool = False, access_token: str | None = None
+) -> dict[str, str]:
     # Start with default headers
     headers = {
-        "authorization": f"Bearer {get_auth_token().access_token}",
+        "authorization": f"Bearer {access_token}"
+        if access_token is not None
+        else get_token_manager().bearer(),
         "Bb-Api-Subscription-Key": BB_API_SUBSCRIPTION_KEY,
         "Content-Type": "application/json",
     }
@@ -92,27 +242,229 @@ def generic_request(
         elif isinstance(incoming_headers, dict):
             # Merge dict headers
             headers.update(incoming_headers)
+    return headers
+
+
+def configure_throttling(
+    rate: float | None = None,
+    burst: int | None = None,
+    max_concurrency: int | None = None,
+    retry_policy: RetryPolicy | None = None,
+) -> RateLimiter:
+    """Replace the process-wide rate limiter and, optionally, retry policy."""
+    _client.rate_limiter = RateLimiter(
+        rate=rate, burst=burst, max_concurrency=max_concurrency
+    )
+    if retry_policy is not None:
+        _client.retry_policy = retry_policy
+    return _client.rate_limiter
+
+
+def throttle_stats() -> ThrottleStats:
+    return _client.rate_limiter.stats
+
+
+def configure_cache(
+    ttl: float = 300.0,
+    max_entries: int = 2048,
+    max_bytes: int = 64 * 1024 * 1024,
+    disk_path: str | None = None,
+) -> ResponseCache:
+    """Attach a GET response cache to the process-wide client."""
+    _client.cache = ResponseCache(
+        ttl=ttl, max_entries=max_entries, max_bytes=max_bytes, disk_path=disk_path
+    )
+    return _client.cache
+
+
+def configure_coalescing(enabled: bool = True) -> SingleFlight | None:
+    """Share one request and one parsed model between identical concurrent GETs.
+
+    Callers of a coalesced request receive the same model instance, so treat
+    results as read-only or copy them before mutating.
+    """
+    _client.single_flight = SingleFlight() if enabled else None
+    return _client.single_flight
+
+
+def decode_stats() -> DecodeStats:
+    return _client.decode_stats
+
+
+def configure_write_check(check: Callable[[BaseModel], object] | None) -> None:
+    """Run `check` on every model the write helpers send, before sending.
+
+    An exception from `check` stops the write; None turns checking off.
+    """
+    _client.check_write = check
+
+
+def write_json(model: BaseModel, **kwargs) -> str:
+    """The JSON body of a write, after the configured write check."""
+    if (check := _client.check_write) is not None:
+        check(model)
+    return model.model_dump_json(**kwargs)
+
+
+def generic_request(
+    method: HttpMethods, url: str, json=None, drop_headers: bool = False, **kwargs
+) -> Response:
+    # Handle headers parameter - can be dict or list of Header objects
+    headers = build_headers(
+        incoming_headers=kwargs.pop("headers", None), drop_headers=drop_headers
+    )
+    client = _client
+    send = lambda x: _send(
+        client=client, method=method, url=url, headers=x, json=json, **kwargs
+    )
+    with span(REQUEST, url=url, **{"http.method": method}) as current:
+        # drop_headers marks pre-signed upload URLs, which are never cached
+        if client.cache is None or drop_headers:
+            response = send(headers)
+        elif method == HttpMethods.GET:
+            response = client.cache.fetch(
+                url=url, params=kwargs.get("params"), headers=headers, send=send
+            )
+        else:
+            response = send(headers)
+            if response.ok:
+                client.cache.invalidate(url)
+        current.set(
+            cache_hit=getattr(response, "from_cache", False),
+            **{"http.status_code": response.status_code},
+        )
+    return response
+
+
+def _send(
+    client: Client,
+    method: HttpMethods,
+    url: str,
+    headers: dict[str, str],
+    json=None,
+    **kwargs,
+) -> Response:
     reify = None
     if json is None:
-        reify = lambda x: _session.request(
-            method=method, url=url, headers=x, **kwargs
-        )
+        reify = lambda x: client.request(method=method, url=url, headers=x, **kwargs)
     else:
-        reify = lambda x: _session.request(
+        reify = lambda x: client.request(
             method=method, url=url, headers=x, json=json, **kwargs
         )
-    response = reify(x=headers)
-    if response.status_code == 403:
-        headers["authorization"] = f"Bearer {get_auth_token().access_token}"
-        return reify(x=headers)
-    else:
-        return response
+    attempt = 0
+    auth_retried = False
+    headers = dict(headers)
+    # a streamed body has to start over on every attempt
+    body = kwargs.get("data")
+    start = body.tell() if hasattr(body, "seek") and hasattr(body, "tell") else None
+    while True:
+        response = None
+        if start is not None:
+            body.seek(start)
+        try:
+            with (
+                client.rate_limiter.slot(),
+                span(
+                    HTTP, url=url, attempt=attempt, **{"http.method": method}
+                ) as current,
+            ):
+                response = reify(x=headers)
+                current.set(
+                    bytes_sent=_body_size(response),
+                    bytes_received=_content_size(response, kwargs.get("stream")),
+                    **{"http.status_code": response.status_code},
+                )
+        except (ConnectionError, Timeout):
+            if not client.retry_policy.can_retry(method, attempt):
+                raise
+            delay = client.retry_policy.backoff(attempt)
+        else:
+            if response.status_code == 403 and not auth_retried:
+                auth_retried = True
+                headers["authorization"] = get_token_manager().bearer()
+                continue
+            delay = client.retry_policy.delay_for(method, response, attempt)
+            if delay is None:
+                return response
+            if response.status_code == 429:
+                # one thread hitting the quota holds back all of them
+                client.rate_limiter.pause(delay)
+        client.rate_limiter.record_retry(
+            delay, rate_limited=response is not None and response.status_code == 429
+        )
+        time.sleep(delay)
+        attempt += 1
+
+
+def _body_size(response: Response) -> int:
+    request = response.request
+    if request is None:
+        return 0
+    if isinstance(request.body, (bytes, str)):
+        return len(request.body)
+    # streamed uploads
+    return int(request.headers.get("Content-Length") or 0)
+
+
+def _content_size(response: Response, stream: bool | None) -> int:
+    # reading .content of a streamed response would drain it
+    if stream:
+        return int(response.headers.get("Content-Length") or 0)
+    return len(response.content or b"")
 
 
 def api_request(
     method: HttpMethods,
     url: str,
     response_model: Type[T] | None = None,
+    decode_mode: DecodeMode | None = None,
+    **kwargs,
+) -> T | Response:
+    with span(API_REQUEST, url=url, **{"http.method": method}):
+        return _coalesced_request(
+            method=method,
+            url=url,
+            response_model=response_model,
+            decode_mode=decode_mode,
+            **kwargs,
+        )
+
+
+def _coalesced_request(
+    method: HttpMethods,
+    url: str,
+    response_model: Type[T] | None = None,
+    decode_mode: DecodeMode | None = None,
+    **kwargs,
+) -> T | Response:
+    decode_mode = decode_mode or DecodeMode.VALIDATE
+    flight = _client.single_flight
+    # only plain GETs are safe to share, custom headers or bodies opt out
+    if flight is not None and method == HttpMethods.GET and kwargs.keys() <= {"params"}:
+        return flight.do(
+            key=(cache_key(url, kwargs.get("params")), response_model, decode_mode),
+            fn=lambda: _api_request(
+                method=method,
+                url=url,
+                response_model=response_model,
+                decode_mode=decode_mode,
+                **kwargs,
+            ),
+        )
+    return _api_request(
+        method=method,
+        url=url,
+        response_model=response_model,
+        decode_mode=decode_mode,
+        **kwargs,
+    )
+
+
+def _api_request(
+    method: HttpMethods,
+    url: str,
+    response_model: Type[T] | None = None,
+    decode_mode: DecodeMode = DecodeMode.VALIDATE,
     **kwargs,
 ) -> T | Response:
     response = generic_request(method=method, url=url, **kwargs)
@@ -120,6 +472,19 @@ def api_request(
         return response
     elif response.status_code and response_model:
         assert issubclass(response_model, BaseModel)
-        return response_model.model_validate_json(json_data=response.text)
+        # parse the raw bytes, response.text would decode to str first
+        with span(
+            DECODE,
+            url=url,
+            decode_mode=decode_mode,
+            model=response_model.__name__,
+            bytes=len(response.content),
+        ):
+            return decode(
+                response_model=response_model,
+                content=response.content,
+                mode=decode_mode,
+                stats=_client.decode_stats,
+            )
 
     return response
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+
+import pytest
+
+from sky_edge import aio, util
+from sky_edge.aio import constituent
+from sky_edge.api.constituent import Address, ConstituentListQuery
+from sky_edge.util import Collection
+
+
+def page(n: int) -> Collection[int]:
+    return Collection[int](count=3, next_link=f"page{n + 1}", value=[n])
+
+
+async def collect(first: Collection[int]) -> list[int]:
+    return [item async for item in aio.iter_all(first)]
+
+
+def test_iter_pages_forwards_any_worker_error(monkeypatch):
+    async def fetch_next(collection):
+        # e.g. AppTokens(**error_json) on an unexpected token response
+        raise TypeError("unexpected keyword argument")
+
+    monkeypatch.setattr(aio, "fetch_next", fetch_next)
+
+    async def run() -> None:
+        await asyncio.wait_for(collect(page(0)), timeout=5)
+
+    with pytest.raises(TypeError):
+        asyncio.run(run())
+
+
+def test_iter_pages_cancels_worker_on_early_stop(monkeypatch):
+    fetched: list[str] = []
+
+    async def fetch_next(collection):
+        fetched.append(collection.next_link)
+        return page(len(fetched))
+
+    monkeypatch.setattr(aio, "fetch_next", fetch_next)
+
+    async def run() -> set[asyncio.Task]:
+        pages = aio.iter_pages(page(0), prefetch=1)
+        async for collection in pages:
+            if collection.value == [2]:
+                break
+        await pages.aclose()
+        await asyncio.sleep(0)
+        return asyncio.all_tasks() - {asyncio.current_task()}
+
+    assert asyncio.run(run()) == set()
+    # the worker stops once the prefetch queue is full and is not resumed
+    assert len(fetched) <= 4
+
+
+def test_write_check_runs_off_the_event_loop(monkeypatch):
+    threads: list[int] = []
+
+    def check(model):
+        # a code table refresh blocks here
+        threads.append(threading.get_ident())
+
+    async def api_request(**kwargs):
+        return kwargs["data"]
+
+    monkeypatch.setattr(constituent, "api_request", api_request)
+    util.configure_write_check(check)
+    try:
+        body = asyncio.run(
+            constituent.address_patch(
+                Address(id="1", constituent_id="2", type="Home", city="Oslo")
+            )
+        )
+    finally:
+        util.configure_write_check(None)
+
+    assert '"city":"Oslo"' in body
+    assert threads and threads[0] != threading.get_ident()
+
+
+def test_constituent_list_get_projects_fields(monkeypatch):
+    sent = {}
+
+    async def api_request(**kwargs):
+        sent.update(kwargs)
+        return kwargs["response_model"].model_validate(
+            {"count": 1, "value": [{"id": "1", "name": "Ada"}]}
+        )
+
+    monkeypatch.setattr(constituent, "api_request", api_request)
+    query = ConstituentListQuery(fields=["id", "name"], limit=10)
+    page = asyncio.run(constituent.constituent_list_get(query))
+
+    assert sent["params"]["fields"] == "id,name"
+    assert set(type(page.value[0]).model_fields) == {"id", "name"}
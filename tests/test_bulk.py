@@ -0,0 +1,55 @@
+from pydantic import BaseModel, ValidationError
+from requests import ConnectionError
+
+from sky_edge.bulk import bulk_mutate
+
+
+class Item(BaseModel):
+    id: str
+
+
+class Created(BaseModel):
+    id: str
+
+
+def operation(item: Item) -> Created:
+    if item.id == "value":
+        raise ValueError("bad item")
+    if item.id == "invalid":
+        Created.model_validate({})
+    if item.id == "connection":
+        raise ConnectionError("reset")
+    return Created(id=f"new-{item.id}")
+
+
+def test_bulk_mutate_isolates_item_failures():
+    ids = ["a", "value", "b", "invalid", "connection", "c"]
+    results = {
+        r.key: r
+        for r in bulk_mutate(
+            [Item(id=id) for id in ids], operation, workers=2, max_attempts=3
+        )
+    }
+
+    assert set(results) == set(ids)
+    for id in ("a", "b", "c"):
+        assert results[id].ok and results[id].id == f"new-{id}"
+    assert isinstance(results["value"].error, ValueError)
+    assert isinstance(results["invalid"].error, ValidationError)
+    assert not results["value"].ok and not results["invalid"].ok
+    # only transport errors are retried
+    assert results["value"].attempts == 1
+    assert results["connection"].attempts == 3
+    assert isinstance(results["connection"].error, ConnectionError)
+
+
+def test_bulk_mutate_checkpoint_skips_done(tmp_path):
+    path = tmp_path / "done.log"
+    items = [Item(id=id) for id in ("a", "value", "b")]
+    first = list(bulk_mutate(items, operation, checkpoint=path))
+    assert sum(r.ok for r in first) == 2
+
+    second = {r.key: r for r in bulk_mutate(items, operation, checkpoint=path)}
+    assert second["a"].skipped and second["b"].skipped
+    assert second["b"].id == "new-b"
+    assert not second["value"].skipped and not second["value"].ok
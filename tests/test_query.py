@@ -0,0 +1,28 @@
+import io
+
+import pytest
+
+from sky_edge.api import query
+
+CASES = [
+    ("[12.5]", [12.5]),
+    ("[1e5]", [1e5]),
+    ("[1234567, 2.5]", [1234567, 2.5]),
+    ("[-0.5e-3, 1E+2, 7]", [-0.5e-3, 1e2, 7]),
+    ('[{"a": 1.25}, 3.0e1, "x", true, null]', [{"a": 1.25}, 30.0, "x", True, None]),
+    ("[ 1.5 ,\r\n 2 ]", [1.5, 2]),
+    ("[]", []),
+]
+
+
+@pytest.mark.parametrize(("text", "expected"), CASES)
+def test_iter_json_array_every_chunk_size(monkeypatch, text, expected):
+    for size in range(1, len(text) + 1):
+        monkeypatch.setattr(query, "CHUNK_SIZE", size)
+        assert list(query._iter_json_array(io.StringIO(text))) == expected, size
+
+
+def test_iter_json_array_truncated(monkeypatch):
+    monkeypatch.setattr(query, "CHUNK_SIZE", 2)
+    with pytest.raises(ValueError):
+        list(query._iter_json_array(io.StringIO("[1.5, 2")))
@@ -0,0 +1,13 @@
+from sky_edge import util
+
+
+def test_configure_client_keeps_write_check():
+    def check(model):
+        return None
+
+    util.configure_write_check(check)
+    try:
+        util.configure_client()
+        assert util.get_client().check_write is check
+    finally:
+        util.configure_write_check(None)
@@ -0,0 +1,43 @@
+import threading
+import time
+
+from werkzeug.test import Client
+
+from sky_edge.api.webhook import WebhookEvent, WebhookReceiver, _events
+
+
+def post(client: Client, n: int) -> int:
+    event = WebhookEvent(id=str(n), type="com.blackbaud.constituent.change.v1")
+    return client.post(data=_events.dump_json([event])).status_code
+
+
+def test_slow_handler_backs_up_into_503():
+    release = threading.Event()
+    handled: list[str] = []
+
+    def handler(events: list[WebhookEvent]) -> None:
+        release.wait()
+        handled.extend(e.id for e in events)
+
+    receiver = WebhookReceiver(
+        batch_size=1, max_delay=0, workers=1, max_pending=10, invalidate_cache=False
+    )
+    receiver.add_handler(handler)
+    client = Client(receiver)
+    try:
+        statuses = [post(client, n) for n in range(50)]
+        # the busy worker holds one batch and the batcher another
+        assert statuses.count(202) <= 10 + 2
+        assert receiver.stats.rejected == statuses.count(503) > 0
+    finally:
+        release.set()
+
+    # redelivered events are taken once there is room, exactly once
+    for n in range(50):
+        while post(client, n) == 503:
+            time.sleep(0.01)
+    receiver.close()
+
+    assert sorted(handled, key=int) == [str(n) for n in range(50)]
+    assert receiver.stats.handled == 50
+    assert receiver.stats.duplicates == statuses.count(202)